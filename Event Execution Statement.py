@@ -1,156 +1,185 @@
 import streamlit as st
 import pandas as pd
 import datetime
-from fpdf import FPDF
-from PIL import Image
 import io
-import pytesseract
 import base64
-import matplotlib.pyplot as plt
-import matplotlib
-from matplotlib.font_manager import FontProperties
-
-# --- 한글 폰트 설정 (Colab 환경) ---
-NANUM_FONT_PATH = "/usr/share/fonts/truetype/nanum/NanumGothic.ttf"
-NANUM_BOLD_PATH = "/usr/share/fonts/truetype/nanum/NanumGothicBold.ttf"
-pytesseract.pytesseract.tesseract_cmd = "/usr/bin/tesseract"
-matplotlib.rcParams['axes.unicode_minus'] = False
-
-def set_korean_font(ax):
-    font_prop = FontProperties(fname=NANUM_FONT_PATH)
-    for label in (ax.get_xticklabels() + ax.get_yticklabels()):
-        label.set_fontproperties(font_prop)
-        label.set_fontsize(12)
-    if hasattr(ax.title, 'set_fontproperties'):
-        ax.title.set_fontproperties(font_prop)
-        ax.title.set_fontsize(13)
-    if hasattr(ax.xaxis.label, 'set_fontproperties'):
-        ax.xaxis.label.set_fontproperties(font_prop)
-    if hasattr(ax.yaxis.label, 'set_fontproperties'):
-        ax.yaxis.label.set_fontproperties(font_prop)
-
-# --- 세션 상태 초기화 및 프로젝트 리스트 ---
-if "expense_db" not in st.session_state:
-    st.session_state.expense_db = pd.DataFrame(columns=[
-        "ID", "프로젝트", "분류", "날짜", "금액", "설명", "여행자", "이미지", "수량", "비고"
-    ])
-if "travelers" not in st.session_state: st.session_state.travelers = []
-if "budget" not in st.session_state: st.session_state.budget = {}
-if "categories" not in st.session_state: st.session_state.categories = ["교통", "숙박", "식비", "관광", "쇼핑", "기타"]
-if "projects" not in st.session_state:
-    st.session_state.projects = ["전체 프로젝트"]  # 기본 프로젝트 이름
+import os
+import tempfile
+from ledger_store import LedgerStore, DEFAULT_LEDGER_PATH
+from ledger_service import LedgerService
+from receipt_store import ReceiptStore, DEFAULT_RECEIPT_DIR, is_receipt_hash
+from receipt_ocr import OcrCache, ocr_cached, ocr_batch, tesseract_version
+from csv_import import import_csv
+from settlement import compute_balances, minimize_transfers
+from perf_metrics import metrics, process_memory_bytes
+
+# --- 경비 원장 서비스 (모든 세션이 공유, 쓰기는 단일 큐로 직렬화) ---
+@st.cache_resource
+def get_ledger_service():
+    return LedgerService(LedgerStore(os.environ.get("LEDGER_DB_PATH", DEFAULT_LEDGER_PATH)))
+
+@st.cache_resource
+def get_receipt_store():
+    return ReceiptStore(os.environ.get("RECEIPT_DIR", DEFAULT_RECEIPT_DIR))
+
+@st.cache_resource
+def get_ocr_cache():
+    return OcrCache(os.environ.get("RECEIPT_DIR", DEFAULT_RECEIPT_DIR))
+
+# 앱을 실행할 때 main() 에서 연다. OCR spawn 워커가 이 스크립트를 __mp_main__ 으로 다시 불러와도
+# 원장 DB 를 열거나 쓰기 스레드를 띄우지 않도록 모듈을 읽는 시점에는 만들지 않는다.
+ledger = receipts = ocr_cache = None
+
+# --- 무거운 라이브러리(fpdf, matplotlib, pytesseract)는 해당 메뉴에서 처음 쓸 때 불러온다 ---
+# 폰트 파싱, tesseract 설치 확인 같은 초기화는 프로세스당 한 번만 한다.
+@st.cache_resource(show_spinner=False)
+def get_pdf_module():
+    import pdf_report
+    pdf_report.preload_fonts()
+    return pdf_report
+
+@st.cache_resource(show_spinner=False)
+def get_chart_module():
+    import charts
+    charts.korean_font()
+    return charts
+
+@st.cache_resource(show_spinner=False)
+def get_tesseract_version():
+    return tesseract_version()
+
+# --- 공유 조회 캐시: 원장 버전이 바뀐 경우에만 다시 읽는다 ---
+# 집계·설정·한 페이지 조회는 작아 많이 담아 두고, 원장을 통째로 읽는 query 는 몇 개만 잠깐 둔다
+FRAME_METHODS = {"query"}
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _cached_view(version, method, *args, **kwargs):
+    return getattr(ledger, method)(*args, **kwargs)
+
+@st.cache_data(max_entries=4, ttl=300, show_spinner=False)
+def _cached_frame(version, method, *args, **kwargs):
+    return getattr(ledger, method)(*args, **kwargs)
+
+def view(method, *args, **kwargs):
+    cached = _cached_frame if method in FRAME_METHODS else _cached_view
+    return cached(ledger.version(), method, *args, **kwargs)
+
+SEARCH_LIMIT = 1000  # 설명/비고 검색 결과 최대 건수
+
+# --- 예산, 분류, 프로젝트 목록 (원장 DB 설정 테이블에 저장, 모든 세션 공유) ---
+DEFAULT_CATEGORIES = ["교통", "숙박", "식비", "관광", "쇼핑", "기타"]
+def get_budget(): return view("get_setting", "budget", {})
+def get_categories(): return view("get_setting", "categories", DEFAULT_CATEGORIES)
+def get_projects():
+    projects = ["전체 프로젝트"] + view("get_setting", "projects", [])  # 기본 프로젝트 이름
+    return projects + [p for p in view("distinct", "프로젝트") if p not in projects]
 
 
 ADMIN_PASSWORD = "admin123"
 
-# --- PDF 보고서 클래스 ---
-class ExpenseReportPDF(FPDF):
-    def __init__(self, title="예산 집행내역서", project="", period=""):
-        super().__init__(orientation='L', unit='mm', format='A4')
-        self.report_title = title
-        self.project = project
-        self.period = period
-        self.add_font("NanumGothic", "", NANUM_FONT_PATH, uni=True)
-        self.add_font("NanumGothic", "B", NANUM_BOLD_PATH, uni=True)
-        self.add_font("NanumGothic", "I", NANUM_FONT_PATH, uni=True)
-        self.set_auto_page_break(auto=True, margin=15)
-
-    def header(self):
-        self.set_font("NanumGothic", "B", 15)
-        self.cell(0, 12, self.report_title, 0, 1, "C")
-        self.set_font("NanumGothic", "", 11)
-        if self.project:
-            self.cell(0, 7, f"프로젝트/행사명 : {self.project}", 0, 1)
-        if self.period:
-            self.cell(0, 7, f"활동 기간 : {self.period}", 0, 1)
-        self.ln(3)
-
-    def footer(self):
-        self.set_y(-13)
-        self.set_font("NanumGothic", "I", 8)
-        self.cell(0, 10, f"Page {self.page_no()}", 0, 0, "C")
-
-    def add_table_header(self):
-        self.set_fill_color(230, 240, 250)
-        self.set_font("NanumGothic", "B", 10)
-        headers = ["ID", "일자", "분류", "내역/설명", "단가", "수량", "금액", "참여자", "비고"]
-        self.col_widths = [20, 27, 20, 90, 18, 12, 22, 21, 27]
-        for i, header in enumerate(headers):
-            self.cell(self.col_widths[i], 8, header, 1, 0, "C", 1)
-        self.ln()
-
-    def add_expense_row(self, idx, row):
-        self.set_font("NanumGothic", "", 9)
-        get = lambda k: str(row.get(k, "") if pd.notnull(row.get(k, "")) else "")
-        self.cell(self.col_widths[0], 7, get("ID"), 1)
-        self.cell(self.col_widths[1], 7, get("날짜"), 1)
-        self.cell(self.col_widths[2], 7, get("분류"), 1)
-        self.cell(self.col_widths[3], 7, get("설명")[:35], 1)  # 설명 길이 제한
-        self.cell(self.col_widths[4], 7, "{:,}".format(int(float(row.get("금액", 0) or 0))), 1, 0, "R")
-        qty = int(float(row.get("수량") or 1))
-        self.cell(self.col_widths[5], 7, str(qty), 1, 0, "R")
-        amount = int(float(row.get("금액", 0) or 0)) * qty
-        self.cell(self.col_widths[6], 7, "{:,}".format(amount), 1, 0, "R")
-        self.cell(self.col_widths[7], 7, get("여행자"), 1)
-        self.cell(self.col_widths[8], 7, get("비고"), 1)
-        self.ln()
-
-    def add_table(self, expense_df):
-        self.add_table_header()
-        for idx, (_, row) in enumerate(expense_df.iterrows(), 1):
-            self.add_expense_row(idx, row)
-
-    def add_summary(self, total, balance):
-        self.ln(3)
-        self.set_font("NanumGothic", "B", 11)
-        self.cell(0, 9, f"집행 총계: ￦{total:,}    잔여 예산: ￦{balance:,}", 0, 1, "R")
-
-def generate_pdf_report_bytes(expense_df, report_title="예산 집행내역서", project_name="", period=""):
-    pdf = ExpenseReportPDF(report_title, project=project_name, period=period)
-    pdf.add_page()
-    if "수량" not in expense_df.columns:
-        expense_df = expense_df.copy()
-        expense_df["수량"] = 1
-    if "비고" not in expense_df.columns:
-        expense_df["비고"] = ""
-    pdf.add_table(expense_df)
-    total_spent = sum(int(float(row["금액"]) if pd.notnull(row["금액"]) else 0) *
-                      int(float(row.get("수량", 1) or 1)) for _, row in expense_df.iterrows())
-    budget_total = st.session_state.budget.get("total", 0) if st.session_state.budget else 0
-    balance = budget_total - total_spent if budget_total > 0 else 0
-    pdf.add_summary(total_spent, balance)
-    return pdf.output(dest='S').encode('latin1')
-
 # --- OCR, 이미지 ---
-def extract_expense_info_from_image(image):
-    text = pytesseract.image_to_string(image, lang="kor+eng")
-    amount, date = 0, None
-    import re
-    amounts = re.findall(r"\d{3,}", text.replace(",", ""))
-    if amounts: amount = max(map(int, amounts))
-    date_match = re.search(r"((19|20)\d{2}[-/.](0[1-9]|1[0-2])[-/.](0[1-9]|[12][0-9]|3[01]))", text)
-    if date_match: date = date_match.group(1).replace(".", "-").replace("/", "-")
-    return date, amount
-def img_to_base64(img):
-    buffered = io.BytesIO()
-    img.save(buffered, format="PNG")
-    return base64.b64encode(buffered.getvalue()).decode()
+@metrics.timed("app_ocr_seconds", mode="single")
+def extract_expense_info_from_image(data, img_hash=None, crop_totals=False):
+    # 이미지 해시로 캐시하므로 재실행/재업로드 시 OCR 을 다시 돌리지 않는다
+    result = ocr_cached(data, ocr_cache, digest=img_hash, crop_totals=crop_totals)
+    return result["date"], result["amount"]
 def base64_to_img(img_str):
+    # 해시면 저장소에서 원본을 읽고, 이전 버전의 base64 문자열이면 그대로 디코딩
+    if is_receipt_hash(img_str):
+        return receipts.open(img_str)
+    from PIL import Image
     buffered = io.BytesIO(base64.b64decode(img_str))
     return Image.open(buffered)
-
-# --- 정산 ---
-def get_settlement_info(df):
-    if df.empty: return [], 0, {}
-    travelers = df["여행자"].unique().tolist()
-    total = df["금액"].sum()
-    per_person = total / len(travelers) if travelers else 0
-    per_person_amount = {}
-    for t in travelers:
-        spent = df[df["여행자"] == t]["금액"].sum()
-        per_person_amount[t] = spent
-    balances = {t: round(per_person - amt) for t, amt in per_person_amount.items()}
-    return travelers, per_person, balances
+def store_receipt(data):
+    # 원본을 저장하고, 이 세션에서 처음 보는 영수증이면 중복 탐지용 지각 해시를 원장 DB 에 기록한다
+    digest = receipts.put(data)
+    hashed = st.session_state.setdefault("hashed_receipts", set())
+    if digest not in hashed:
+        ledger.add_receipt_hashes({digest: receipts.perceptual_hash(digest)})
+        hashed.add(digest)
+    return digest
+def to_receipt_ref(value):
+    # 이전 버전 CSV 의 base64 PNG 는 저장소로 옮기고(지각 해시도 기록) 해시로 바꾼다
+    if not isinstance(value, str) or not value or is_receipt_hash(value):
+        return value if isinstance(value, str) else ""
+    return store_receipt(base64.b64decode(value))
+
+# --- 중복 청구 의심 ---
+def show_duplicates(suspects, row_label=None):
+    # 의심 사유 옆에 겹치는 기존 경비의 날짜·금액·참여자를 붙여 보여 준다 (한 건 등록이면 행 번호 생략)
+    existing = ledger.rows(suspects["ID"].dropna().unique(), columns=["ID", "날짜", "금액", "여행자", "설명"])
+    suspects = suspects.rename(columns={"행": row_label}) if row_label else suspects.drop(columns="행")
+    table = suspects.merge(existing, on="ID", how="left")
+    st.dataframe(table, hide_index=True, use_container_width=True)
+
+# --- CSV 일괄 등록 ---
+def run_csv_import(csv_file, source=None, **kwargs):
+    # 업로더에 파일이 남아 있는 동안 재실행돼도 같은 파일은 한 번만 등록한다 (source: ZIP 안의 CSV 등)
+    imported = st.session_state.setdefault("imported_files", set())
+    if csv_file.file_id in imported:
+        st.info("이미 등록한 파일입니다.")
+        return None
+    progress = st.empty()
+    with metrics.timer("app_csv_import_seconds"):
+        result = import_csv(csv_file if source is None else source, ledger, on_chunk=lambda n, r: progress.write(
+            f"처리 중... 정상 {r.rows_ok:,}건 / 오류 {r.rows_bad:,}건"), **kwargs)
+    progress.empty()
+    imported.add(csv_file.file_id)
+    if result.rows_bad:
+        st.warning(f"형식 오류로 {result.rows_bad:,}건을 건너뛰었습니다.")
+        st.dataframe(pd.DataFrame(result.errors, columns=["CSV 줄", "사유"]), use_container_width=True)
+    if result.rows_duplicate:
+        skipped = "건너뛰었습니다" if kwargs.get("duplicates") == "skip" else "그대로 등록했습니다"
+        st.warning(f"중복 청구가 의심되는 {result.rows_duplicate:,}건을 {skipped}.")
+        show_duplicates(pd.DataFrame(result.duplicates, columns=["행", "ID", "사유"]).astype({"ID": "Int64"}),
+                        row_label="CSV 줄")
+    return result
+
+# --- 내보내기 / 분할 파일 불러오기 ---
+EXPORT_KINDS = {  # 형식: (파일 이름, MIME)
+    "CSV": ("expense_data.csv", "text/csv"),
+    "CSV + 영수증 원본 (ZIP)": ("expense_data_receipts.zip", "application/zip"),
+    "Parquet (프로젝트별, ZIP)": ("expense_data_parquet.zip", "application/zip"),
+    "Arrow IPC (프로젝트별, ZIP)": ("expense_data_arrow.zip", "application/zip"),
+}
+def build_export(kind, images):
+    import ledger_export
+    out = tempfile.TemporaryFile()
+    if kind == "CSV":
+        ledger_export.write_csv(ledger, out, images)
+    elif kind == "CSV + 영수증 원본 (ZIP)":
+        ledger_export.write_csv_zip(ledger, out, receipts)
+    else:
+        ledger_export.write_partitioned_zip(ledger, out, "parquet" if kind.startswith("Parquet") else "arrow", images)
+    out.seek(0)
+    return out
+
+def run_archive_import(zip_file):
+    # 내보내기 ZIP 복원: "CSV + 영수증 원본" 이면 영수증을 저장소에 넣은 뒤 CSV 로, 아니면
+    # Parquet/Arrow 분할 파일을 임시 디렉토리에 풀어 메모리 맵으로 청크씩 읽어 원장을 교체한다
+    import zipfile
+    import ledger_export
+    imported = st.session_state.setdefault("imported_files", set())
+    if zip_file.file_id in imported:
+        st.info("이미 등록한 파일입니다.")
+        return None
+    with zipfile.ZipFile(zip_file) as zf:
+        names = zf.namelist()
+        if "expense_data.csv" in names:
+            for name in names:
+                if name.startswith("receipts/") and is_receipt_hash(os.path.basename(name)):
+                    store_receipt(zf.read(name))
+            with zf.open("expense_data.csv") as csv_source:
+                return run_csv_import(zip_file, source=csv_source, keep_ids=True, replace=True,
+                                      map_image=to_receipt_ref)
+        if not any(name.endswith((".parquet", ".arrow")) for name in names):
+            raise ValueError("이 앱에서 내보낸 ZIP 이 아닙니다. (expense_data.csv 또는 Parquet/Arrow 파일 없음)")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            zf.extractall(tmp_dir)
+            with metrics.timer("app_csv_import_seconds", format="partitioned"):
+                result = ledger_export.import_partitioned(tmp_dir, ledger, replace=True)
+    imported.add(zip_file.file_id)
+    return result
 
 # --- 가이드 ---
 def show_guide_page():
@@ -168,7 +197,7 @@ def show_guide_page():
     3. **현황/분석**: 표, 그래프, 상세 내역
     4. **정산**: 더치페이, 잔액 자동계산
     5. **보고서**: 맞춤제목, 행사명, 기간 저장·다운로드
-    6. **데이터 관리**: CSV 내보내기/불러오기  
+    6. **데이터 관리**: CSV·Parquet 내보내기/불러오기  
     ---
     ### 💡 활용 예시
     - 행사/워크숍 집행내역서
@@ -177,71 +206,40 @@ def show_guide_page():
     - 여럿이 여행가서 더치페이까지
     """)
 
-def main():
-    st.set_page_config(page_title="다목적 예산 집행/정산 시스템", layout="wide")
-    st.title("📊 다목적 예산 집행·정산 시스템")
-
-    st.sidebar.header("🔐 관리자 로그인")
-    password_input = st.sidebar.text_input("관리자 비밀번호 입력", type="password")
-    is_admin = password_input == ADMIN_PASSWORD
-    if is_admin: st.sidebar.success("관리자 로그인 성공")
-    else: st.sidebar.info("관리자만 고급 기능 접근 가능")
-
-    # 프로젝트 선택 및 신규 프로젝트 추가/삭제 UI
-    st.sidebar.markdown("### 프로젝트 선택 및 관리")
-    # 신규 프로젝트 추가
-    new_project_name = st.sidebar.text_input("새 프로젝트 이름 추가")
-    if st.sidebar.button("프로젝트 추가"):
-        np = new_project_name.strip()
-        if np and np not in st.session_state.projects:
-            st.session_state.projects.append(np)
-            st.success(f"프로젝트 '{np}'가 추가되었습니다.")
-        elif not np:
-            st.sidebar.warning("프로젝트 이름을 입력하세요.")
-        else:
-            st.sidebar.warning("이미 존재하는 프로젝트입니다.")
-
-    # 프로젝트 삭제 (관리자 전용)
-    if is_admin:
-        project_to_delete = st.sidebar.selectbox("프로젝트 삭제", options=st.session_state.projects)
-        if st.sidebar.button("프로젝트 삭제하기"):
-            if project_to_delete and project_to_delete != "전체 프로젝트":
-                # 삭제 전 안내 및 처리
-                confirm = st.sidebar.checkbox(f"'{project_to_delete}' 프로젝트 삭제 확인")
-                if confirm:
-                    # 프로젝트 관련 경비 모두 삭제
-                    st.session_state.expense_db = st.session_state.expense_db[st.session_state.expense_db["프로젝트"] != project_to_delete]
-                    st.session_state.projects.remove(project_to_delete)
-                    st.success(f"프로젝트 '{project_to_delete}'가 삭제되었습니다.")
-            else:
-                st.sidebar.warning("전체 프로젝트는 삭제할 수 없습니다.")
-
-    # 선택 가능한 프로젝트 목록
-    selected_project = st.sidebar.selectbox(
-        "프로젝트 선택",
-        options=st.session_state.projects,
-        index=0 if "전체 프로젝트" in st.session_state.projects else None,
-        help="보고 관리할 프로젝트를 선택하세요"
-    )
-
-    # 프로젝트 필터링 함수
-    def filter_expenses_by_project(df, project):
-        if project == "전체 프로젝트":
-            return df
-        else:
-            return df[df["프로젝트"] == project]
-
-    menu = [
-        "시스템 설명",
-        "예산/분류 관리",
-        "경비 등록",
-        "경비 현황/분석",
-        "여행자 정산/더치페이",
-        "집행내역서 보고서(PDF)",
-        "데이터 입/출력"
-    ]
-    choice = st.sidebar.selectbox("기능 선택", menu)
-
+# --- 성능 진단 (관리자) ---
+def show_diagnostics_page():
+    st.header("🩺 성능 진단")
+    rows, col_bytes, file_bytes = view("storage_stats")
+    rss = process_memory_bytes()
+    n_receipts, receipt_bytes, thumb_bytes = receipts.disk_usage()
+    metrics.set_gauge("app_process_resident_bytes", rss)
+    metrics.set_gauge("app_ledger_rows", rows)
+    for col, n in col_bytes.items():
+        metrics.set_gauge("app_ledger_column_bytes", n, column=col)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("프로세스 메모리", f"{rss / 2**20:,.1f} MB")
+    col2.metric("원장 행 수 / DB 파일", f"{rows:,}건 / {file_bytes / 2**20:,.1f} MB")
+    col3.metric("영수증 원본 / 썸네일", f"{n_receipts:,}장 / {(receipt_bytes + thumb_bytes) / 2**20:,.1f} MB")
+
+    st.subheader("구간별 처리 시간")
+    st.dataframe(pd.DataFrame(metrics.summary()), use_container_width=True)
+
+    st.subheader("원장 컬럼별 크기")
+    st.write("이미지 컬럼에는 해시만 저장되고, 원본은 영수증 디렉토리에 있습니다.")
+    size_table = pd.DataFrame({"저장 (KB)": col_bytes / 1024})
+    if st.button("메모리 사용량 측정 (전체 원장을 DataFrame 으로 읽음)"):
+        with metrics.timer("app_page_seconds", page="진단: 전체 원장 로드"):
+            size_table["메모리 (KB)"] = view("query").memory_usage(deep=True, index=False) / 1024
+    st.dataframe(size_table.round(1), use_container_width=True)
+
+    st.download_button("📈 Prometheus 텍스트 내보내기", metrics.to_prometheus().encode("utf-8"),
+                       file_name="expense_app.prom", mime="text/plain")
+    if st.button("계측값 초기화"):
+        metrics.reset()
+        st.success("계측값을 초기화했습니다.")
+
+def render_page(choice, selected_project, projects, is_admin):
+    """선택한 메뉴 화면을 그린다."""
     if choice == "시스템 설명":
         show_guide_page()
 
@@ -250,35 +248,41 @@ def main():
             st.warning("관리자만 접근 가능합니다.")
             return
         st.header("예산/카테고리 관리")
+        budget, categories = get_budget(), get_categories()
         with st.form("budget_form2"):
-            total_budget = st.number_input("총 예산(원)", min_value=0, value=st.session_state.budget.get("total", 0))
-            dict_budget = {c: st.number_input(f"{c} 예산(원)", min_value=0, value=st.session_state.budget.get(c, 0))
-                           for c in st.session_state.categories}
+            total_budget = st.number_input("총 예산(원)", min_value=0, value=budget.get("total", 0))
+            dict_budget = {c: st.number_input(f"{c} 예산(원)", min_value=0, value=budget.get(c, 0))
+                           for c in categories}
             submit_budget = st.form_submit_button("저장")
             if submit_budget:
                 dict_budget["total"] = total_budget
-                st.session_state.budget = dict_budget
+                ledger.set_setting("budget", dict_budget)
+                budget = dict_budget
                 st.success("예산/카테고리 저장")
         with st.expander("카테고리 추가/삭제"):
             new_cat = st.text_input("새 카테고리")
             if st.button("카테고리 추가"):
-                if new_cat and new_cat not in st.session_state.categories:
-                    st.session_state.categories.append(new_cat)
+                if new_cat and new_cat not in categories:
+                    categories = ledger.update_setting(
+                        "categories", lambda cs: cs if new_cat in cs else cs + [new_cat], DEFAULT_CATEGORIES)
                     st.success(f"‘{new_cat}’ 추가")
-            cat_del = st.selectbox("삭제할 카테고리", st.session_state.categories)
+            cat_del = st.selectbox("삭제할 카테고리", categories)
             if st.button("카테고리 삭제"):
-                if cat_del in st.session_state.categories and len(st.session_state.categories) > 1:
-                    st.session_state.categories.remove(cat_del)
+                if cat_del in categories and len(categories) > 1:
+                    categories = ledger.update_setting(
+                        "categories", lambda cs: [c for c in cs if c != cat_del] if len(cs) > 1 else cs,
+                        DEFAULT_CATEGORIES)
                     st.success(f"‘{cat_del}’ 삭제")
-        if st.session_state.budget:
-            filtered_expense_df = filter_expenses_by_project(st.session_state.expense_db, selected_project)
-            total_spent = filtered_expense_df["금액"].sum()
-            st.write(f"**총 지출:** {total_spent:,} 원 / **총 예산:** {st.session_state.budget.get('total', 0):,} 원")
-            if total_spent > st.session_state.budget.get("total", 0) > 0:
+        if budget:
+            # 집계 테이블 조회: 행 수와 무관하게 분류 수만큼만 읽는다
+            cat_totals = view("category_totals", selected_project)
+            total_spent = int(cat_totals.sum())
+            st.write(f"**총 지출:** {total_spent:,} 원 / **총 예산:** {budget.get('total', 0):,} 원")
+            if total_spent > budget.get("total", 0) > 0:
                 st.error("⚠️ 총 예산 초과!")
-            for cat in st.session_state.categories:
-                cat_spent = filtered_expense_df[filtered_expense_df["분류"] == cat]["금액"].sum()
-                budget_val = st.session_state.budget.get(cat, 0)
+            for cat in categories:
+                cat_spent = int(cat_totals.get(cat, 0))
+                budget_val = budget.get(cat, 0)
                 st.write(f"• {cat} 지출: {cat_spent:,} 원 / 예산: {budget_val:,} 원")
                 if cat_spent > budget_val > 0:
                     st.error(f"⚠️ '{cat}' 예산초과!")
@@ -290,59 +294,111 @@ def main():
             ocr_date, ocr_amount = None, 0
             img_str = ""
             if uploaded_file:
-                img = Image.open(uploaded_file)
-                st.image(img, caption="영수증 이미지")
-                ocr_date, ocr_amount = extract_expense_info_from_image(img)
-                st.write(f"OCR 추출: 날짜 {ocr_date}, 금액 {ocr_amount:,} 원")
-                img_str = img_to_base64(img)
+                img_bytes = uploaded_file.getvalue()
+                img_str = store_receipt(img_bytes)
+                st.image(receipts.thumbnail(img_str), caption="영수증 이미지")
+                if get_tesseract_version() is None:
+                    st.warning("tesseract 가 설치되어 있지 않아 OCR 없이 직접 입력합니다.")
+                else:
+                    ocr_date, ocr_amount = extract_expense_info_from_image(img_bytes, img_str)
+                    st.write(f"OCR 추출: 날짜 {ocr_date}, 금액 {ocr_amount:,} 원")
+                suspects = ledger.find_duplicates({"날짜": ocr_date, "금액": ocr_amount, "이미지": img_str})
+                if len(suspects):
+                    st.warning("이미 청구된 영수증과 같거나 비슷합니다. 중복 청구가 아닌지 확인하세요.")
+                    show_duplicates(suspects)
+        with st.expander("영수증 여러 장 일괄 OCR 등록"):
+            batch_files = st.file_uploader("영수증 사진 (여러 장)", type=["png", "jpg", "jpeg"],
+                                           accept_multiple_files=True, key="batch_receipts")
+            batch_category = st.selectbox("일괄 등록 분류", get_categories(), key="batch_category")
+            batch_traveler = st.text_input("일괄 등록 참여자", key="batch_traveler")
+            crop_totals = st.checkbox("합계 영역만 인식 (빠름)", key="batch_crop_totals")
+            if batch_files and st.button("일괄 OCR 실행"):
+                items, names = [], {}
+                for f in batch_files:
+                    data = f.getvalue()
+                    digest = store_receipt(data)
+                    items.append((digest, data))
+                    names[digest] = f.name
+                progress = st.progress(0.0, text="OCR 대기 중")
+                def on_progress(digest, result, done, total):
+                    progress.progress(done / total, text=f"{done}/{total} 완료: {names[digest]}")
+                if get_tesseract_version() is None:
+                    # 워커를 띄우지 않고 바로 직접 입력 표로 넘긴다
+                    st.warning("tesseract 가 설치되어 있지 않아 날짜/금액을 직접 입력해야 합니다.")
+                    results = {d: {"date": None, "amount": 0, "error": "tesseract 미설치"} for d in names}
+                else:
+                    with metrics.timer("app_ocr_seconds", mode="batch"):
+                        results = ocr_batch(items, ocr_cache, crop_totals=crop_totals, on_progress=on_progress)
+                batch_ocr = pd.DataFrame([{
+                    "등록": True,
+                    "파일": names[digest],
+                    "날짜": pd.to_datetime(results[digest]["date"] or datetime.date.today(), errors="coerce"),
+                    "금액": results[digest]["amount"],
+                    "오류": results[digest].get("error", ""),
+                    "중복 의심": "",
+                    "이미지": digest,
+                } for digest in names])
+                # 중복 청구가 의심되는 영수증은 사유를 붙이고 등록 체크를 해제해 둔다
+                suspects = ledger.find_duplicates(batch_ocr.assign(여행자=batch_traveler))
+                reasons = suspects.groupby("행")["사유"].agg(" / ".join)
+                batch_ocr.loc[reasons.index, "중복 의심"] = reasons
+                batch_ocr.loc[reasons.index, "등록"] = False
+                st.session_state.batch_ocr = batch_ocr
+            if st.session_state.get("batch_ocr") is not None:
+                batch_df = st.data_editor(st.session_state.batch_ocr, disabled=["파일", "오류", "중복 의심", "이미지"],
+                                          use_container_width=True, key="batch_ocr_editor")
+                if st.button("일괄 등록"):
+                    project_name_this = selected_project if selected_project != "전체 프로젝트" else "기본 프로젝트"
+                    batch_df = batch_df[batch_df["등록"]]
+                    # 날짜가 없으면 기간 필터·보고서에서 빠지고 내보내기→복원 때 오류로 버려지므로 등록하지 않는다
+                    no_date = pd.to_datetime(batch_df["날짜"], errors="coerce").isna()
+                    if no_date.any():
+                        st.error(f"날짜가 없는 영수증 {no_date.sum()}건은 등록할 수 없습니다. 표에서 날짜를 입력하거나 "
+                                 f"등록 체크를 해제하세요: {', '.join(batch_df.loc[no_date, '파일'])}")
+                    else:
+                        ledger.append(pd.DataFrame({
+                            "프로젝트": project_name_this,
+                            "분류": batch_category,
+                            "날짜": batch_df["날짜"],
+                            "금액": batch_df["금액"],
+                            "설명": batch_df["파일"],
+                            "여행자": batch_traveler,
+                            "이미지": batch_df["이미지"],
+                            "수량": 1,
+                            "비고": "",
+                        }))
+                        st.session_state.batch_ocr = None
+                        st.success(f"영수증 경비 {len(batch_df)}건 등록 완료")
         with st.expander("CSV 파일 업로드로 경비 일괄 등록"):
             csv_file = st.file_uploader("CSV 파일 업로드 (프로젝트, 분류, 날짜, 금액, 설명, 여행자, 수량[선택], 비고[선택])", type=["csv"])
+            skip_duplicates = st.checkbox("중복 청구 의심 행은 등록하지 않기", value=False,
+                                          help="기본은 모두 등록하고 의심 행만 표시합니다. 매일 같은 금액의 일비처럼 반복되는 경비도 의심으로 잡힐 수 있습니다.")
             if csv_file:
                 try:
-                    df_csv = pd.read_csv(csv_file)
-                    # 프로젝트 컬럼 자동 추가 if 없으면 선택 프로젝트 또는 "기본 프로젝트"
-                    if "프로젝트" not in df_csv.columns:
-                        df_csv["프로젝트"] = selected_project if selected_project != "전체 프로젝트" else "기본 프로젝트"
-                    required_cols = {"프로젝트", "분류", "날짜", "금액", "설명", "여행자"}
-                    if not required_cols.issubset(df_csv.columns):
-                        st.error(f"필수 컬럼 누락: {required_cols}")
-                    else:
-                        start_id = len(st.session_state.expense_db) + 1
-                        if "ID" in df_csv.columns:
-                            df_csv.drop(columns=["ID"], inplace=True)
-                        df_csv.reset_index(drop=True, inplace=True)
-                        df_csv["ID"] = range(start_id, start_id + len(df_csv))
-                        cols = df_csv.columns.tolist()
-                        cols = ["ID", "프로젝트"] + [c for c in cols if c not in ("ID", "프로젝트")]
-                        df_csv = df_csv[cols]
-                        for c in ["이미지", "수량", "비고"]:
-                            if c not in df_csv.columns:
-                                df_csv[c] = "" if c != "수량" else 1
-                        st.session_state.expense_db = pd.concat([st.session_state.expense_db, df_csv], ignore_index=True)
-                        for t in df_csv["여행자"].dropna().unique().tolist():
-                            if t not in st.session_state.travelers and t != '':
-                                st.session_state.travelers.append(t)
-                        for p in df_csv["프로젝트"].dropna().unique().tolist():
-                            if p not in st.session_state.projects:
-                                st.session_state.projects.append(p)
-                        st.success(f"CSV 경비 {len(df_csv)}건 등록 완료")
+                    # 프로젝트 컬럼이 없거나 비어 있으면 선택 프로젝트 또는 "기본 프로젝트"
+                    default_project = selected_project if selected_project != "전체 프로젝트" else "기본 프로젝트"
+                    result = run_csv_import(csv_file, default_project=default_project,
+                                            duplicates="skip" if skip_duplicates else "flag")
+                    if result is not None:
+                        st.success(f"CSV 경비 {result.rows_ok:,}건 등록 완료")
+                except ValueError as e:
+                    st.error(str(e))
                 except Exception as e:
                     st.error(f"CSV 처리 오류: {e}")
         with st.form("manual_entry"):
             st.write(f"등록 프로젝트: {selected_project}")
-            category = st.selectbox("경비 분류", st.session_state.categories)
+            category = st.selectbox("경비 분류", get_categories())
             date = st.date_input("경비 날짜", value=datetime.date.today() if 'ocr_date' not in locals() or ocr_date is None else pd.to_datetime(ocr_date))
             amount = st.number_input("금액(원)", min_value=0, value=ocr_amount if ocr_amount else 0)
             description = st.text_area("설명/용도")
             traveler = st.text_input("참여자")
             qty = st.number_input("수량", min_value=1, value=1)
             note = st.text_input("비고 (선택)", value="")
+            allow_duplicate = st.checkbox("중복 의심 경고를 확인했고 그대로 등록")
             submit = st.form_submit_button("등록")
             if submit:
-                new_id = len(st.session_state.expense_db) + 1
                 project_name_this = selected_project if selected_project != "전체 프로젝트" else "기본 프로젝트"
                 new_row = {
-                    "ID": new_id,
                     "프로젝트": project_name_this,
                     "분류": category,
                     "날짜": str(date),
@@ -353,129 +409,276 @@ def main():
                     "수량": qty,
                     "비고": note
                 }
-                st.session_state.expense_db = pd.concat([st.session_state.expense_db, pd.DataFrame([new_row])], ignore_index=True)
-                if traveler and traveler not in st.session_state.travelers:
-                    st.session_state.travelers.append(traveler)
-                if project_name_this not in st.session_state.projects:
-                    st.session_state.projects.append(project_name_this)
-                st.success("경비가 등록되었습니다.")
+                # 넣기 전에 같은 영수증·같은 참여자/금액/날짜 경비가 있는지 확인한다
+                suspects = ledger.find_duplicates(new_row)
+                if len(suspects) and not allow_duplicate:
+                    st.warning("중복 청구가 의심되어 등록하지 않았습니다. 확인 후 체크하고 다시 등록하세요.")
+                    show_duplicates(suspects)
+                else:
+                    ledger.append(new_row)
+                    st.success("경비가 등록되었습니다.")
 
     elif choice == "경비 현황/분석":
         st.header(f"경비 현황 및 분석 (프로젝트: {selected_project})")
 
-        df_filtered = filter_expenses_by_project(st.session_state.expense_db, selected_project)
-        if df_filtered.empty:
+        min_date, max_date = view("date_range", selected_project)
+        if min_date is None:
             st.info("등록된 경비가 없습니다.")
         else:
             # 활동기간 필터 추가: 시작일, 종료일 (분석용)
             st.subheader("활동 기간 필터 (선택적)")
             col1, col2 = st.columns(2)
             with col1:
-                start_date = st.date_input("시작일", value=df_filtered["날짜"].min() if not df_filtered.empty else datetime.date.today())
+                start_date = st.date_input("시작일", value=min_date)
             with col2:
-                end_date = st.date_input("종료일", value=df_filtered["날짜"].max() if not df_filtered.empty else datetime.date.today())
-            # 날짜 필터 적용
-            try:
-                df_filtered_dates = df_filtered[
-                    (pd.to_datetime(df_filtered["날짜"]) >= pd.to_datetime(start_date)) &
-                    (pd.to_datetime(df_filtered["날짜"]) <= pd.to_datetime(end_date))
-                ]
-            except Exception as e:
-                df_filtered_dates = df_filtered  # 필터 오류시 원본 유지
-                st.warning(f"날짜 필터 적용 중 오류: {e}")
+                end_date = st.date_input("종료일", value=max_date)
 
             tab1, tab2, tab3 = st.tabs(["전체 내역", "분류별 통계", "일자별 추이"])
             with tab1:
                 st.write(f"#### 전체 경비 내역 - [{selected_project}]")
+                # 필터·정렬·페이지 나누기는 저장소 쿼리로 처리하고 보이는 페이지만 읽는다
+                fcol1, fcol2 = st.columns(2)
+                with fcol1:
+                    cat_filter = st.multiselect("분류 필터", list(view("category_totals", selected_project).index))
+                with fcol2:
+                    traveler_filter = st.multiselect("참여자 필터", list(view("traveler_totals", selected_project).index))
+                filters = dict(project=selected_project, start=start_date, end=end_date,
+                               category=cat_filter or None, traveler=traveler_filter or None)
+                search_text = st.text_input("설명/비고 검색", placeholder="예: 택시 공항 (모든 단어 포함)").strip()
+                if search_text:
+                    # 검색 색인으로 찾은 ID 목록(관련도 순)을 페이지로 나눠 해당 행만 읽는다
+                    found_ids = view("search", search_text, **filters, limit=SEARCH_LIMIT)
+                    total_rows = len(found_ids)
+                else:
+                    total_rows = view("count", **filters)
+                scol1, scol2, scol3, scol4 = st.columns(4)
+                if search_text:
+                    with scol1:
+                        st.caption("검색 결과는 관련도 순으로 정렬됩니다.")
+                else:
+                    with scol1:
+                        sort_by = st.selectbox("정렬 기준", ["ID", "날짜", "금액", "분류", "여행자"])
+                    with scol2:
+                        descending = st.checkbox("내림차순", value=False)
+                with scol3:
+                    page_size = st.selectbox("페이지당 행 수", [25, 50, 100, 200], index=1)
+                n_pages = max(1, -(-total_rows // page_size))
+                with scol4:
+                    page_no = st.number_input(f"페이지 (전체 {n_pages:,})", min_value=1, max_value=n_pages, value=1, step=1)
                 view_cols = ["ID", "여행자", "분류", "날짜", "금액", "설명", "수량", "비고"]
-                show_df = df_filtered_dates[view_cols].astype(str)
-                st.dataframe(show_df, use_container_width=True)
+                offset = (page_no - 1) * page_size
+                if search_text:
+                    page_df = view("rows", found_ids[offset:offset + page_size], columns=view_cols)
+                else:
+                    page_df = view("page", **filters, sort_by=sort_by, descending=descending,
+                                   limit=page_size, offset=offset, columns=view_cols)
+                st.caption(f"{total_rows:,}건 중 {offset + 1 if total_rows else 0:,}–{offset + len(page_df):,}"
+                           + (f" (검색 결과는 최대 {SEARCH_LIMIT:,}건)" if search_text else ""))
+                st.dataframe(page_df, hide_index=True, use_container_width=True)
                 def show_detail(row):
                     st.write(row.to_dict())
-                    if row["이미지"]:
-                        st.image(base64_to_img(row["이미지"]), width=300)
+                    image = row["이미지"]
+                    if pd.isna(image) or not image:
+                        return
+                    # 해시만 있는 내보내기를 영수증 폴더 없이 복원하면 원본이 없을 수 있다
+                    if is_receipt_hash(image) and not receipts.exists(image):
+                        st.caption("영수증 원본 없음")
+                    else:
+                        st.image(base64_to_img(image), width=300)
                 detail_id = st.number_input("상세보기 ID", min_value=1, step=1)
-                if detail_id in df_filtered_dates["ID"].values:
-                    row = df_filtered_dates[df_filtered_dates["ID"] == detail_id].iloc[0]
+                # 기본 키 조회 한 번으로 찾고, 선택한 프로젝트·기간 안의 경비만 보여 준다
+                row = view("get", detail_id)
+                if row is not None and selected_project in ("전체 프로젝트", row["프로젝트"]) \
+                        and pd.notna(row["날짜"]) and start_date <= row["날짜"].date() <= end_date:
                     st.write("상세 내역")
                     show_detail(row)
             with tab2:
                 st.write(f"#### [분류별 집행 통계 - {selected_project}]")
-                cat_totals = df_filtered_dates.groupby("분류")["금액"].sum().sort_values(ascending=False)
-                fig, ax = plt.subplots(figsize=(8, 5))
-                cat_totals.plot(kind="bar", ax=ax, color="#90caf9")
-                set_korean_font(ax)
-                ax.set_xlabel("분류")
-                ax.set_ylabel("합계(원)")
-                ax.set_title("분류별 집행액")
-                plt.xticks(rotation=0, ha='center')
-                plt.tight_layout()
-                st.pyplot(fig)
+                cat_totals = view("category_totals", selected_project, start_date, end_date).sort_values(ascending=False)
+                # 집계 결과가 같으면 캐시된 PNG 를 그대로 쓴다
+                with metrics.timer("app_chart_seconds", chart="category"):
+                    st.image(get_chart_module().category_bar_png(cat_totals))
             with tab3:
                 st.write(f"#### [일자별 집행 추이 - {selected_project}]")
-                date_totals = df_filtered_dates.groupby("날짜")["금액"].sum().sort_index()
-                fig2, ax2 = plt.subplots(figsize=(8, 5))
-                date_totals.plot(kind="line", marker='o', ax=ax2, color="#4caf50")
-                set_korean_font(ax2)
-                ax2.set_xlabel("날짜")
-                ax2.set_ylabel("합계(원)")
-                ax2.set_title("일자별 집행 추이")
-                plt.xticks(rotation=0, ha='center')
-                plt.tight_layout()
-                st.pyplot(fig2)
+                date_totals = view("date_totals", selected_project, start_date, end_date)
+                # 기간이 길면 주/월 단위로 묶어 그린다
+                with metrics.timer("app_chart_seconds", chart="trend"):
+                    st.image(get_chart_module().date_trend_png(date_totals))
 
     elif choice == "여행자 정산/더치페이":
         st.header(f"참여자별 정산 (프로젝트: {selected_project})")
-        df_filtered = filter_expenses_by_project(st.session_state.expense_db, selected_project)
-        travelers, per_person, balances = get_settlement_info(df_filtered)
-        st.write(f"총 지출액: {df_filtered['금액'].sum():,} 원")
-        st.write(f"참여자 수: {len(travelers)}")
-        st.write(f"1인당 평균 부담금: {per_person:,.0f} 원")
+        project_options = [p for p in projects if p != "전체 프로젝트"]
+        settle_targets = st.multiselect(
+            "정산할 프로젝트 (여러 개 선택 시 합산 정산, 비우면 선택 프로젝트)", project_options,
+            default=[selected_project] if selected_project in project_options else [])
+        settle_scope = settle_targets or selected_project
+        with st.expander("참여자 가중치 / 경비별 참여자 지정 (선택)"):
+            weight_df = st.data_editor(pd.DataFrame({"참여자": pd.Series(dtype=str), "가중치": pd.Series(dtype=float)}),
+                                       num_rows="dynamic", key="settle_weights")
+            shares_file = st.file_uploader("경비별 참여자 CSV (ID, 참여자, 가중치[선택])", type=["csv"], key="settle_shares")
+        weight_rows = weight_df.dropna()
+        weights = dict(zip(weight_rows["참여자"], weight_rows["가중치"])) if not weight_rows.empty else None
+        try:
+            shares = pd.read_csv(shares_file) if shares_file else None
+            if shares is not None:
+                # 경비별 분담은 경비 단위 데이터가 필요하다
+                expense_df = view("query", project=settle_scope, columns=["ID", "여행자", "금액", "수량"])
+            else:
+                # 균등/가중 분담은 참여자별 집계만으로 계산된다
+                spent_by_traveler = view("traveler_totals", settle_scope)
+                expense_df = pd.DataFrame({"ID": range(len(spent_by_traveler)),
+                                           "여행자": spent_by_traveler.index, "금액": spent_by_traveler.values})
+            balance_table = compute_balances(expense_df, shares=shares, weights=weights)
+        except ValueError as e:
+            # 가중치 0 이하, 필수 컬럼 누락 등은 정산하지 않고 알린다
+            st.error(str(e))
+            return
+        transfers = minimize_transfers(balance_table["정산"])
+        total_spent = balance_table["지출"].sum()
+        st.write(f"총 지출액: {total_spent:,.0f} 원")
+        st.write(f"참여자 수: {len(balance_table)}")
+        st.write(f"1인당 평균 부담금: {total_spent / len(balance_table) if len(balance_table) else 0:,.0f} 원")
         st.dataframe(pd.DataFrame({
-            "참여자": list(balances.keys()),
-            "개인 지출": [balances[t] + per_person for t in balances],
-            "정산 필요 금액 (양수:더 부담, 음수:환급)": list(balances.values())
-        }))
+            "참여자": balance_table.index,
+            "개인 지출": balance_table["지출"].values,
+            "부담액": balance_table["부담"].round().values,
+            "정산 필요 금액 (양수:더 부담, 음수:환급)": balance_table["정산"].values
+        }), use_container_width=True)
         st.info("💡 양수: 추가 부담, 음수: 환급")
+        st.write(f"#### 송금 목록 (최소 {len(transfers):,}건)")
+        st.dataframe(pd.DataFrame(transfers, columns=["보내는 사람", "받는 사람", "금액"]), use_container_width=True)
 
     elif choice == "집행내역서 보고서(PDF)":
         st.header(f"집행내역서 보고서 생성 및 다운로드 (프로젝트: {selected_project})")
         report_title = st.text_input("보고서 제목", value="예산 집행내역서")
         project_name = selected_project if selected_project != "전체 프로젝트" else ""
-        period = st.text_input("활동 기간", value="")
-        df_filtered = filter_expenses_by_project(st.session_state.expense_db, selected_project)
-        if df_filtered.empty:
+        min_date, max_date = view("date_range", selected_project)
+        if min_date is None:
             st.info("등록된 경비가 없습니다.")
         else:
-            pdf_bytes = generate_pdf_report_bytes(df_filtered, report_title, project_name, period)
+            # 활동 기간으로 보고서 대상 경비를 거른다 (인덱스 범위 검색)
+            col1, col2 = st.columns(2)
+            with col1:
+                period_start = st.date_input("활동 시작일", value=min_date)
+            with col2:
+                period_end = st.date_input("활동 종료일", value=max_date)
+            period = st.text_input("활동 기간", value=f"{period_start} ~ {period_end}")
+            df_filtered = view("query", project=selected_project, start=period_start, end=period_end)
+            budget_total = get_budget().get("total", 0)
+            with metrics.timer("app_pdf_report_seconds"):
+                pdf_bytes = get_pdf_module().generate_pdf_report_bytes(
+                    df_filtered, report_title, project_name, period, budget_total)
             st.download_button("📄 PDF 보고서 다운로드", data=pdf_bytes,
                                file_name=f"{report_title}.pdf",
                                mime="application/pdf")
 
     elif choice == "데이터 입/출력":
-        st.header("CSV 내보내기/불러오기")
-        st.download_button(
-            "CSV 다운로드",
-            st.session_state.expense_db.to_csv(index=False).encode("utf-8-sig"),
-            file_name="expense_data.csv")
-        uploaded_csv = st.file_uploader("CSV 불러오기", type=["csv"])
+        st.header("데이터 내보내기/불러오기")
+        export_kind = st.radio("내보내기 형식", list(EXPORT_KINDS), horizontal=True)
+        image_mode = "files" if export_kind == "CSV + 영수증 원본 (ZIP)" else (
+            "hash" if st.checkbox("이미지 컬럼(영수증 해시) 포함", value=True) else "exclude")
+        file_name, mime = EXPORT_KINDS[export_kind]
+        # 누를 때만 청크 단위로 임시 파일에 써서 넘긴다. 만드는 동안 원장 전체를 DataFrame 으로 올리지는 않지만,
+        # Streamlit 이 완성된 파일을 바이트로 읽어 미디어 저장소에 두므로 내보내기 크기만큼의 메모리는 쓴다.
+        st.download_button("내보내기 파일 다운로드", lambda: build_export(export_kind, image_mode),
+                           file_name=file_name, mime=mime)
+        st.caption("원장이 아주 크면 서버에서 `python ledger_export.py <원장 DB> <출력 경로>` 로 디스크에 바로 내보내세요.")
+        # 불러오기는 모든 세션이 함께 쓰는 원장을 통째로 바꾸므로 관리자만, 확인을 받은 뒤에 한다
+        if not is_admin:
+            st.info("불러오기(원장 교체)는 관리자만 할 수 있습니다.")
+            return
+        uploaded_csv = st.file_uploader("불러오기 (CSV, 또는 Parquet/Arrow 내보내기 ZIP)", type=["csv", "zip"])
         if uploaded_csv:
+            st.warning("불러오면 모든 프로젝트의 기존 경비가 이 파일 내용으로 교체됩니다.")
+            confirm = st.checkbox("기존 원장을 이 파일로 교체합니다", key=f"confirm_restore_{uploaded_csv.file_id}")
+            if not st.button("불러오기 실행", disabled=not confirm):
+                return
             try:
-                df = pd.read_csv(uploaded_csv)
-                required = {"ID", "프로젝트", "분류", "날짜", "금액", "설명", "여행자", "이미지", "수량", "비고"}
-                if required.issubset(df.columns):
-                    st.session_state.expense_db = df
-                    st.session_state.travelers = df["여행자"].dropna().unique().tolist()
-                    for p in df["프로젝트"].dropna().unique().tolist():
-                        if p not in st.session_state.projects:
-                            st.session_state.projects.append(p)
-                    if "budget" not in st.session_state or not st.session_state.budget:
-                        st.session_state.budget = {}
-                    st.success("CSV 데이터 정상 반영")
+                if uploaded_csv.name.lower().endswith(".zip"):
+                    result = run_archive_import(uploaded_csv)
                 else:
-                    st.warning(f"필수 컬럼 누락: {required}")
+                    result = run_csv_import(uploaded_csv, keep_ids=True, replace=True, map_image=to_receipt_ref)
+                if result is not None:
+                    st.success(f"데이터 정상 반영 ({result.rows_ok:,}건)")
+            except ValueError as e:
+                st.warning(str(e))
             except Exception as e:
-                st.error(f"CSV 파일 오류: {e}")
+                st.error(f"파일 오류: {e}")
+
+    elif choice == "성능 진단 (관리자)":
+        if not is_admin:
+            st.warning("관리자만 접근 가능합니다.")
+            return
+        show_diagnostics_page()
+
+def main():
+    global ledger, receipts, ocr_cache
+    ledger, receipts, ocr_cache = get_ledger_service(), get_receipt_store(), get_ocr_cache()
+    st.set_page_config(page_title="다목적 예산 집행/정산 시스템", layout="wide")
+    st.title("📊 다목적 예산 집행·정산 시스템")
+
+    st.sidebar.header("🔐 관리자 로그인")
+    password_input = st.sidebar.text_input("관리자 비밀번호 입력", type="password")
+    is_admin = password_input == ADMIN_PASSWORD
+    if is_admin: st.sidebar.success("관리자 로그인 성공")
+    else: st.sidebar.info("관리자만 고급 기능 접근 가능")
+
+    # 프로젝트 선택 및 신규 프로젝트 추가/삭제 UI
+    st.sidebar.markdown("### 프로젝트 선택 및 관리")
+    # 신규 프로젝트 추가
+    new_project_name = st.sidebar.text_input("새 프로젝트 이름 추가")
+    if st.sidebar.button("프로젝트 추가"):
+        np = new_project_name.strip()
+        if np and np not in get_projects():
+            ledger.update_setting("projects", lambda ps: ps if np in ps else ps + [np], [])
+            st.success(f"프로젝트 '{np}'가 추가되었습니다.")
+        elif not np:
+            st.sidebar.warning("프로젝트 이름을 입력하세요.")
+        else:
+            st.sidebar.warning("이미 존재하는 프로젝트입니다.")
+
+    # 프로젝트 삭제 (관리자 전용)
+    if is_admin:
+        project_to_delete = st.sidebar.selectbox("프로젝트 삭제", options=get_projects())
+        if st.sidebar.button("프로젝트 삭제하기"):
+            if project_to_delete and project_to_delete != "전체 프로젝트":
+                # 삭제 전 안내 및 처리
+                confirm = st.sidebar.checkbox(f"'{project_to_delete}' 프로젝트 삭제 확인")
+                if confirm:
+                    # 프로젝트 관련 경비 모두 삭제
+                    ledger.delete_project(project_to_delete)
+                    ledger.update_setting("projects", lambda ps: [p for p in ps if p != project_to_delete], [])
+                    st.success(f"프로젝트 '{project_to_delete}'가 삭제되었습니다.")
+            else:
+                st.sidebar.warning("전체 프로젝트는 삭제할 수 없습니다.")
+
+    # 선택 가능한 프로젝트 목록
+    projects = get_projects()
+    selected_project = st.sidebar.selectbox(
+        "프로젝트 선택",
+        options=projects,
+        index=0 if "전체 프로젝트" in projects else None,
+        help="보고 관리할 프로젝트를 선택하세요"
+    )
+
+    menu = [
+        "시스템 설명",
+        "예산/분류 관리",
+        "경비 등록",
+        "경비 현황/분석",
+        "여행자 정산/더치페이",
+        "집행내역서 보고서(PDF)",
+        "데이터 입/출력",
+        "성능 진단 (관리자)"
+    ]
+    choice = st.sidebar.selectbox("기능 선택", menu)
+
+    # 메뉴별 처리 시간 (조기 return 도 포함해 기록된다)
+    with metrics.timer("app_page_seconds", page=choice):
+        render_page(choice, selected_project, projects, is_admin)
 
 if __name__ == "__main__":
     main()
+    # 로컬 수집기(node_exporter textfile 등)용 파일: 환경변수로 경로를 지정하면 실행마다 갱신
+    if os.environ.get("METRICS_TEXTFILE"):
+        metrics.write_textfile(os.environ["METRICS_TEXTFILE"])
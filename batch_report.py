@@ -0,0 +1,114 @@
+"""집행내역서 PDF 와 정산표를 프로젝트별로 한 번에 만드는 명령줄 도구 (Streamlit 불필요).
+
+    python batch_report.py expense_ledger.db -o reports/
+    python batch_report.py expense_data.csv -o reports/ --projects "워크숍" "학회" --workers 8
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from csv_import import import_csv
+from ledger_store import LedgerStore
+from pdf_report import write_pdf_report
+from settlement import compute_balances, minimize_transfers
+
+# --- 워커 프로세스 ---
+_worker_ledger = None
+
+
+def _init_worker(ledger_path):
+    # 프로세스마다 원장 연결을 하나씩 열어 두고 프로젝트 조회에 재사용한다
+    global _worker_ledger
+    _worker_ledger = LedgerStore(ledger_path)
+
+
+def safe_filename(name):
+    """프로젝트 이름을 파일 이름으로 바꾼다. 바꾼 글자가 있으면 원래 이름의 짧은 해시를 붙여
+    "a/b" 와 "a:b", "워크숍 1" 과 "워크숍_1" 처럼 다른 프로젝트가 같은 파일을 덮어쓰지 않게 한다."""
+    safe = re.sub(r'[\\/:*?"<>|\s]+', "_", name).strip("_") or "project"
+    if safe == name:
+        return safe
+    return f"{safe}_{hashlib.sha1(name.encode('utf-8')).hexdigest()[:8]}"
+
+
+def build_project_report(project, out_dir, report_title="예산 집행내역서", budget_total=0):
+    """한 프로젝트의 PDF 보고서와 정산 CSV(참여자별 잔액, 송금 목록)를 쓰고 요약을 반환한다."""
+    df = _worker_ledger.query(project=project)
+    first, last = df["날짜"].min(), df["날짜"].max()
+    period = f"{first:%Y-%m-%d} ~ {last:%Y-%m-%d}" if df["날짜"].notna().any() else ""
+    base = os.path.join(out_dir, safe_filename(project))
+    total = write_pdf_report(df, base + ".pdf", report_title, project, period, budget_total)
+
+    balances = compute_balances(df)
+    transfers = minimize_transfers(balances["정산"])
+    balances.reset_index().to_csv(base + "_정산.csv", index=False, encoding="utf-8-sig")
+    pd.DataFrame(transfers, columns=["보내는 사람", "받는 사람", "금액"]).to_csv(
+        base + "_송금.csv", index=False, encoding="utf-8-sig")
+    return {"project": project, "rows": len(df), "total": total, "transfers": len(transfers)}
+
+
+# --- 실행 ---
+def open_ledger_path(source, tmp_dir):
+    """원장 DB 경로를 돌려준다. CSV 면 검증을 거쳐 임시 DB 로 옮긴다."""
+    if not source.lower().endswith(".csv"):
+        return source
+    path = os.path.join(tmp_dir, "ledger.db")
+    ledger = LedgerStore(path)
+    result = import_csv(source, ledger, keep_ids=True)
+    ledger.close()
+    if result.rows_bad:
+        print(f"경고: 형식 오류로 {result.rows_bad:,}건을 건너뛰었습니다.", file=sys.stderr)
+    return path
+
+
+def run(source, out_dir, projects=None, workers=None, report_title="예산 집행내역서"):
+    os.makedirs(out_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ledger_path = open_ledger_path(source, tmp_dir)
+        ledger = LedgerStore(ledger_path)
+        projects = projects or sorted(ledger.distinct("프로젝트"))
+        budget_total = (ledger.get_setting("budget", {}) or {}).get("total", 0)
+        ledger.close()
+        summaries, failures = [], []
+        workers = min(workers or os.cpu_count() or 1, max(len(projects), 1))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(ledger_path,)) as pool:
+            futures = {pool.submit(build_project_report, p, out_dir, report_title, budget_total): p
+                       for p in projects}
+            for future in as_completed(futures):
+                project = futures[future]
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    failures.append((project, e))
+                    print(f"[실패] {project}: {type(e).__name__}: {e}", file=sys.stderr)
+                    continue
+                summaries.append(summary)
+                print(f"[완료] {project}: {summary['rows']:,}건, 총 {summary['total']:,}원, "
+                      f"송금 {summary['transfers']}건")
+    return summaries, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="프로젝트별 집행내역서 PDF / 정산 CSV 일괄 생성")
+    parser.add_argument("ledger", help="원장 파일 (SQLite .db 또는 내보낸 CSV)")
+    parser.add_argument("-o", "--out", default="reports", help="출력 디렉토리 (기본: reports)")
+    parser.add_argument("--projects", nargs="+", help="대상 프로젝트 (기본: 전체)")
+    parser.add_argument("--workers", type=int, help="워커 프로세스 수 (기본: CPU 코어 수)")
+    parser.add_argument("--title", default="예산 집행내역서", help="보고서 제목")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    summaries, failures = run(args.ledger, args.out, args.projects, args.workers, args.title)
+    print(f"{len(summaries)}개 프로젝트 완료, {len(failures)}개 실패 ({time.perf_counter() - started:.1f}초)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""합성 원장으로 주요 처리 경로의 시간을 재고 결과를 JSON 으로 남기는 벤치마크.
+
+    python benchmark.py                           # 1k / 100k / 1M 행
+    python benchmark.py --sizes 1000 100000 --projects 50 --travelers 200 -o bench.json
+    python benchmark.py --images samples/         # OCR 은 샘플 영수증 이미지로 측정
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from csv_import import import_csv
+from ledger_store import LEDGER_COLUMNS, LedgerStore
+from pdf_report import generate_pdf_report_bytes
+from settlement import compute_balances, get_settlement_info, minimize_transfers
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+APP_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Event Execution Statement.py")
+DEFAULT_CATEGORIES = ["교통", "숙박", "식비", "관광", "쇼핑", "기타"]
+_DESCRIPTIONS = ["택시", "KTX 왕복", "점심 식사", "저녁 회식", "숙소 1박", "입장권", "기념품", "커피",
+                 "렌터카", "주차비", "문구류", "인쇄비", "회의실 대여", "간식", "버스"]
+
+
+# --- 합성 원장 ---
+def zipf_keys(rng, n, a, size):
+    """0..n-1 을 순위 k 의 확률이 1/(k+1)**a 에 비례하도록 뽑는다. (잘라 내지 않아 꼬리가 마지막 키에 쌓이지 않는다)"""
+    weights = 1.0 / np.arange(1, n + 1) ** a
+    return rng.choice(n, size, p=weights / weights.sum())
+
+
+def generate_ledger(rows, projects=50, travelers=200, categories=len(DEFAULT_CATEGORIES),
+                    image_ratio=0.1, seed=0):
+    """저장소 스키마(ID, 프로젝트, 분류, 날짜, 금액, 설명, 여행자, 이미지, 수량, 비고)의 합성 원장."""
+    rng = np.random.default_rng(seed)
+    category_names = (DEFAULT_CATEGORIES + [f"분류{i}" for i in range(categories)])[:categories]
+    # 프로젝트/참여자는 실제 원장처럼 일부에 몰리도록 지프 분포에 가깝게 뽑는다
+    project_ids = zipf_keys(rng, projects, 1.3, rows)
+    traveler_ids = zipf_keys(rng, travelers, 1.2, rows)
+    start = np.datetime64("2024-01-01")
+    dates = start + (project_ids * 7 + rng.integers(0, 14, rows)).astype("timedelta64[D]")
+    has_image = rng.random(rows) < image_ratio
+    images = np.where(has_image, np.char.mod("%064x", rng.integers(0, 2**62, rows)), "")
+    descriptions = np.array(_DESCRIPTIONS)[rng.integers(0, len(_DESCRIPTIONS), rows)]
+    return pd.DataFrame({
+        "ID": np.arange(1, rows + 1),
+        "프로젝트": np.char.add("행사 ", project_ids.astype(str)),
+        "분류": np.array(category_names)[rng.integers(0, len(category_names), rows)],
+        "날짜": pd.to_datetime(dates).strftime("%Y-%m-%d"),
+        "금액": (rng.lognormal(9.5, 1.0, rows) // 100 * 100).astype("int64"),
+        "설명": np.char.add(descriptions, np.char.mod(" #%d", rng.integers(1, 10_000, rows))),
+        "여행자": np.char.add("참여자", traveler_ids.astype(str)),
+        "이미지": images,
+        "수량": rng.choice([1, 1, 1, 2, 3], rows),
+        "비고": np.where(rng.random(rows) < 0.2, np.char.mod("INV-%06d", rng.integers(0, 10**6, rows)), ""),
+    })[LEDGER_COLUMNS]
+
+
+def sample_receipt_images(count=4, seed=0):
+    """OCR 용 샘플이 없을 때 쓰는 합성 영수증 이미지 (PNG 바이트)."""
+    from PIL import Image, ImageDraw
+    rng = np.random.default_rng(seed)
+    images = []
+    for i in range(count):
+        img = Image.new("RGB", (1600, 2400), "white")
+        draw = ImageDraw.Draw(img)
+        lines = ["RECEIPT", f"2024-0{i % 9 + 1}-1{i % 9}"] + [f"ITEM {j}   {int(rng.integers(1, 99)) * 100:,}"
+                                                             for j in range(12)]
+        lines.append(f"TOTAL   {int(rng.integers(100, 999)) * 100:,}")
+        for j, line in enumerate(lines):
+            draw.text((100, 100 + j * 150), line, fill="black")
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        images.append(buf.getvalue())
+    return images
+
+
+def load_images(path):
+    names = sorted(n for n in os.listdir(path) if n.lower().endswith((".png", ".jpg", ".jpeg")))
+    images = []
+    for name in names:
+        with open(os.path.join(path, name), "rb") as f:
+            images.append(f.read())
+    return images
+
+
+# --- 측정 ---
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return {"best": min(times), "median": statistics.median(times), "runs": times}
+
+
+def bench_size(rows, args, images):
+    df = generate_ledger(rows, args.projects, args.travelers, args.categories, seed=args.seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "ledger.csv")
+        df.to_csv(csv_path, index=False, encoding="utf-8-sig")
+        ledger = LedgerStore(os.path.join(tmp, "ledger.db"))
+        # 적재 자체가 이후 측정의 준비 단계이므로 CSV 가져오기는 한 번만 잰다
+        results["csv_import"] = timed(lambda: import_csv(csv_path, ledger, keep_ids=True), 1)
+        del df
+        project = "행사 0"  # 지프 분포라 첫 프로젝트가 가장 크다
+        first, last = ledger.date_range(project)
+        middle = first + (last - first) / 2
+        r = args.repeat
+
+        results["project_filter"] = timed(lambda: ledger.query(project=project), r)
+        results["date_range_filter"] = timed(lambda: ledger.query(project=project, start=first, end=middle), r)
+
+        def budget_loop():
+            cat_totals = ledger.category_totals(project)
+            return [int(cat_totals.get(c, 0)) for c in DEFAULT_CATEGORIES]
+        results["budget_category_loop"] = timed(budget_loop, r)
+        results["analysis_category_groupby"] = timed(lambda: ledger.category_totals(project, first, last), r)
+        results["analysis_date_groupby"] = timed(lambda: ledger.date_totals(project, first, last), r)
+
+        project_df = ledger.query(project=project)
+        results["get_settlement_info"] = timed(lambda: get_settlement_info(project_df), r)
+
+        def settlement_rollup():
+            spent = ledger.traveler_totals()
+            table = compute_balances(pd.DataFrame({"ID": range(len(spent)), "여행자": spent.index,
+                                                   "금액": spent.values}))
+            return minimize_transfers(table["정산"])
+        results["settlement_all_projects"] = timed(settlement_rollup, r)
+
+        # 캐시를 피하도록 매번 제목을 바꿔 실제 생성 시간을 잰다
+        pdf_rows = project_df.head(args.pdf_rows)
+        counter = iter(range(10**9))
+        results["generate_pdf_report_bytes"] = timed(
+            lambda: generate_pdf_report_bytes(pdf_rows, f"예산 집행내역서 {next(counter)}", project), r)
+        results["generate_pdf_report_bytes"]["rows"] = len(pdf_rows)
+        results["project_rows"] = len(project_df)
+        ledger.close()
+
+    if images is not None:
+        results["ocr"] = bench_ocr(images)
+    return results
+
+
+def bench_ocr(images):
+    from receipt_ocr import ocr_receipt_bytes
+    try:
+        per_image = timed(lambda: [ocr_receipt_bytes(data) for data in images], 1)
+    except Exception as e:  # tesseract 미설치 등
+        return {"skipped": f"{type(e).__name__}: {e}"}
+    per_image["images"] = len(images)
+    return per_image
+
+
+# 새 인터프리터에서 앱 첫 실행(콜드 스타트)과 재실행 시간을 잰다
+_STARTUP_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.run()
+first = time.perf_counter()
+for _ in range(int(sys.argv[2])):
+    at.run()
+done = time.perf_counter()
+heavy = [m for m in ("matplotlib", "fpdf", "pytesseract", "PIL.Image") if m in sys.modules]
+print(json.dumps({"streamlit_import": imported - started, "first_run": first - imported,
+                  "rerun": (done - first) / int(sys.argv[2]), "heavy_modules_loaded": heavy}))
+"""
+
+
+def bench_startup(repeat, reruns=20):
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, LEDGER_DB_PATH=os.path.join(tmp, "ledger.db"), RECEIPT_DIR=os.path.join(tmp, "r"))
+        for _ in range(repeat):
+            proc = subprocess.run([sys.executable, "-c", _STARTUP_PROBE, APP_SCRIPT, str(reruns)],
+                                  capture_output=True, text=True, env=env, cwd=tmp)
+            if proc.returncode != 0:
+                return {"skipped": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"}
+            runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return {key: min(r[key] for r in runs) for key in ("streamlit_import", "first_run", "rerun")} | {
+        "heavy_modules_loaded": runs[-1]["heavy_modules_loaded"], "runs": runs}
+
+
+def environment():
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="경비 원장 주요 경로 벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="원장 행 수 목록")
+    parser.add_argument("--projects", type=int, default=50, help="프로젝트 수")
+    parser.add_argument("--travelers", type=int, default=200, help="참여자 수")
+    parser.add_argument("--categories", type=int, default=len(DEFAULT_CATEGORIES), help="분류 수")
+    parser.add_argument("--repeat", type=int, default=5, help="항목별 반복 횟수 (최솟값/중앙값 기록)")
+    parser.add_argument("--pdf-rows", type=int, default=5_000, help="PDF 보고서에 넣을 최대 행 수")
+    parser.add_argument("--images", help="OCR 측정용 영수증 이미지 디렉토리 (없으면 합성 이미지)")
+    parser.add_argument("--no-ocr", action="store_true", help="OCR 측정 생략")
+    parser.add_argument("--no-startup", action="store_true", help="앱 콜드 스타트/재실행 측정 생략")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--out", default="benchmark_results.json", help="결과 JSON 경로")
+    args = parser.parse_args(argv)
+
+    images = None if args.no_ocr else (load_images(args.images) if args.images else sample_receipt_images())
+    report = {"environment": environment(), "params": vars(args), "results": {}}
+    if not args.no_startup:
+        report["startup"] = bench_startup(min(args.repeat, 3))
+        if "first_run" in report["startup"]:
+            print(f"  앱 첫 실행 {report['startup']['first_run'] * 1000:.0f} ms, "
+                  f"재실행 {report['startup']['rerun'] * 1000:.0f} ms", file=sys.stderr)
+    for rows in args.sizes:
+        print(f"== {rows:,} 행", file=sys.stderr)
+        # OCR 은 원장 크기와 무관하므로 첫 크기에서만 잰다
+        report["results"][str(rows)] = bench_size(rows, args, images)
+        images = None
+        for name, value in report["results"][str(rows)].items():
+            if isinstance(value, dict) and "best" in value:
+                print(f"  {name:28s} {value['best'] * 1000:10.1f} ms", file=sys.stderr)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import functools
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import matplotlib
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.font_manager import FontProperties
+
+from fonts import NANUM_FONT_PATH
+
+# --- 차트 렌더링 (한글 폰트, PNG 캐시, 기간 리샘플링) ---
+matplotlib.rcParams['axes.unicode_minus'] = False
+
+CHART_CACHE_SIZE = 32
+# 일자별 추이에 그릴 최대 점 수. 이보다 길면 주/월 단위로 묶는다.
+MAX_TREND_POINTS = 120
+
+_chart_cache = OrderedDict()
+_chart_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def korean_font():
+    return FontProperties(fname=NANUM_FONT_PATH)
+
+
+def set_korean_font(ax):
+    font_prop = korean_font()
+    for label in (ax.get_xticklabels() + ax.get_yticklabels()):
+        label.set_fontproperties(font_prop)
+        label.set_fontsize(12)
+    if hasattr(ax.title, 'set_fontproperties'):
+        ax.title.set_fontproperties(font_prop)
+        ax.title.set_fontsize(13)
+    if hasattr(ax.xaxis.label, 'set_fontproperties'):
+        ax.xaxis.label.set_fontproperties(font_prop)
+    if hasattr(ax.yaxis.label, 'set_fontproperties'):
+        ax.yaxis.label.set_fontproperties(font_prop)
+
+
+def resample_totals(date_totals, max_points=MAX_TREND_POINTS):
+    """일자별 합계를 실제 날짜 순으로 정렬하고, 기간이 길면 주/월 단위로 묶는다.
+
+    반환: (합계 Series, 묶음 단위 "일"/"주"/"월")
+    """
+    series = pd.Series(date_totals.values, index=pd.to_datetime(date_totals.index, errors="coerce"))
+    series = series[series.index.notna()].sort_index()
+    if series.empty:
+        return series, "일"
+    span_days = (series.index[-1] - series.index[0]).days + 1
+    if span_days <= max_points:
+        return series, "일"
+    if span_days <= max_points * 7:
+        return series.resample("W-MON", label="left", closed="left").sum(), "주"
+    return series.resample("MS").sum(), "월"
+
+
+def _series_key(kind, series, *extra):
+    h = hashlib.sha256(kind.encode())
+    h.update(pd.util.hash_pandas_object(series, index=True).values.tobytes())
+    h.update("\x1f".join(map(str, extra)).encode())
+    return h.hexdigest()
+
+
+def _cached_render(key, draw):
+    with _chart_lock:
+        if key in _chart_cache:
+            _chart_cache.move_to_end(key)
+            return _chart_cache[key]
+    # pyplot 전역 상태를 쓰지 않는 Figure 를 만들고, PNG 로 저장한 뒤 바로 버린다
+    fig = Figure(figsize=(8, 5))
+    ax = fig.subplots()
+    draw(ax)
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    fig.clear()
+    png = buf.getvalue()
+    with _chart_lock:
+        _chart_cache[key] = png
+        while len(_chart_cache) > CHART_CACHE_SIZE:
+            _chart_cache.popitem(last=False)
+    return png
+
+
+def category_bar_png(cat_totals):
+    def draw(ax):
+        cat_totals.plot(kind="bar", ax=ax, color="#90caf9")
+        set_korean_font(ax)
+        ax.set_xlabel("분류")
+        ax.set_ylabel("합계(원)")
+        ax.set_title("분류별 집행액")
+        ax.tick_params(axis="x", labelrotation=0)
+    return _cached_render(_series_key("category_bar", cat_totals), draw)
+
+
+def date_trend_png(date_totals):
+    series, unit = resample_totals(date_totals)
+
+    def draw(ax):
+        series.plot(kind="line", marker='o' if len(series) <= 60 else None, ax=ax, color="#4caf50")
+        set_korean_font(ax)
+        ax.set_xlabel("날짜" if unit == "일" else f"날짜 ({unit} 단위)")
+        ax.set_ylabel("합계(원)")
+        ax.set_title("일자별 집행 추이")
+        ax.tick_params(axis="x", labelrotation=0)
+    return _cached_render(_series_key("date_trend", series, unit), draw)
@@ -0,0 +1,168 @@
+import contextlib
+import os
+import tempfile
+
+import pandas as pd
+
+from ledger_store import LEDGER_COLUMNS, parse_dates
+
+# --- CSV 일괄 등록 (청크 단위 스트리밍, 스키마 검증) ---
+DEFAULT_CHUNKSIZE = 50_000
+MAX_REPORTED_ERRORS = 1000
+REQUIRED_COLUMNS = {"프로젝트", "분류", "날짜", "금액", "설명", "여행자"}
+
+# 모든 값을 문자열로 읽은 뒤 아래 규칙으로 직접 변환/검증한다 (dtype 추론 없음)
+CSV_DTYPES = {
+    "ID": "string",
+    "프로젝트": "category",
+    "분류": "category",
+    "날짜": "string",
+    "금액": "string",
+    "설명": "string",
+    "여행자": "category",
+    "이미지": "string",
+    "수량": "string",
+    "비고": "string",
+}
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows_ok = 0
+        self.rows_bad = 0
+        self.errors = []  # (CSV 줄 번호, 사유), 최대 MAX_REPORTED_ERRORS 건
+        self.rows_duplicate = 0
+        self.duplicates = []  # (CSV 줄 번호, 겹치는 경비 ID, 사유), 최대 MAX_REPORTED_ERRORS 건
+
+    def add_error(self, line, reason):
+        self.rows_bad += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, reason))
+
+
+def _parse_int(values):
+    cleaned = values.str.replace(r"[,\s원₩￦]", "", regex=True)
+    return cleaned, pd.to_numeric(cleaned, errors="coerce")
+
+
+def validate_chunk(chunk, first_line, default_project="기본 프로젝트", keep_ids=False, seen_ids=None):
+    """청크를 저장소 형식으로 변환하고 (정상 행 DataFrame, [(줄 번호, 사유)]) 를 반환한다."""
+    chunk = chunk.reset_index(drop=True)
+    lines = pd.RangeIndex(first_line, first_line + len(chunk))
+    errors = pd.Series("", index=chunk.index, dtype=object)
+
+    def flag(mask, reason):
+        errors[mask & (errors == "")] = reason
+
+    amount_raw, amount = _parse_int(chunk["금액"].fillna(""))
+    flag(amount_raw == "", "금액 누락")
+    flag(amount.isna() | (amount != amount.round()), "금액 형식 오류")
+    flag(amount < 0, "금액 음수")
+
+    if "수량" in chunk.columns:
+        qty_raw, qty = _parse_int(chunk["수량"].fillna(""))
+        qty = qty.where(qty_raw != "", 1)
+        flag(qty.isna() | (qty < 1) | (qty != qty.round()), "수량 형식 오류")
+    else:
+        qty = pd.Series(1, index=chunk.index)
+
+    dates = parse_dates(chunk["날짜"])
+    flag(dates.isna(), "날짜 형식 오류")
+
+    ids = None
+    if keep_ids and "ID" in chunk.columns:
+        ids = pd.to_numeric(chunk["ID"], errors="coerce")
+        flag(chunk["ID"].notna() & ids.isna(), "ID 형식 오류")
+        flag(ids.notna() & (ids.duplicated() | ids.isin(seen_ids or ())), "ID 중복")
+
+    project = chunk["프로젝트"].astype("string").fillna("").str.strip() if "프로젝트" in chunk.columns \
+        else pd.Series("", index=chunk.index, dtype="string")
+    valid = errors == ""
+    out = pd.DataFrame({
+        "ID": ids if ids is not None else pd.Series(None, index=chunk.index, dtype=float),
+        "프로젝트": project.where(project != "", default_project),
+        "분류": chunk["분류"],
+        "날짜": dates,
+        "금액": amount,
+        "설명": chunk["설명"],
+        "여행자": chunk["여행자"],
+        "이미지": chunk["이미지"] if "이미지" in chunk.columns else "",
+        "수량": qty,
+        "비고": chunk["비고"] if "비고" in chunk.columns else "",
+    })[valid]
+    out["금액"] = out["금액"].astype("int64")
+    out["수량"] = out["수량"].astype("int64")
+    if seen_ids is not None:
+        seen_ids.update(out["ID"].dropna().astype("int64"))
+    bad = [(int(lines[i]), errors[i]) for i in errors.index[~valid]]
+    return out, bad
+
+
+def _map_images(valid, map_image):
+    """이미지 컬럼에 map_image 를 행마다 적용한다. 디코딩할 수 없는 값이 있는 행은 빼고 (정상 행, 실패 행 인덱스) 를 반환한다."""
+    mapped, failed = {}, []
+    for idx, value in valid["이미지"].items():
+        try:
+            mapped[idx] = map_image(value)
+        except (ValueError, OSError):  # binascii.Error, PIL.UnidentifiedImageError 등
+            failed.append(idx)
+    return valid.drop(index=failed).assign(이미지=pd.Series(mapped, dtype=object)), failed
+
+
+def import_csv(source, ledger, default_project="기본 프로젝트", keep_ids=False, replace=False,
+               chunksize=DEFAULT_CHUNKSIZE, map_image=None, on_chunk=None, duplicates=None):
+    """CSV 를 청크 단위로 읽어 검증한 뒤 원장에 추가하고 ImportResult 를 반환한다.
+
+    잘못된 행은 건너뛰고 줄 번호와 사유를 기록하며, 파일 전체를 중단하지 않는다.
+    필수 컬럼이 없으면 원장을 건드리기 전에 ValueError 를 낸다. ID 는 keep_ids 가
+    아니면 원장의 단조 증가 시퀀스에서 발급된다. duplicates 가 "flag" 이면 청크를 넣기 전에
+    중복 청구 의심 행을 기록하고, "skip" 이면 기록한 뒤 등록하지 않는다.
+    replace=True 이면 검증한 청크를 임시 디렉토리에 모아 두었다가 파일을 끝까지 읽은 뒤 한
+    트랜잭션으로 교체하므로, 읽기·변환 도중 실패하면 원장은 그대로 남는다.
+    """
+    if duplicates not in (None, "flag", "skip"):
+        raise ValueError(f"duplicates 는 None, 'flag', 'skip' 중 하나여야 합니다: {duplicates}")
+    result = ImportResult()
+    reader = pd.read_csv(source, dtype=CSV_DTYPES, chunksize=chunksize, encoding="utf-8-sig",
+                         usecols=lambda c: c in LEDGER_COLUMNS, keep_default_na=False, na_values=[""])
+    first_line = 2  # 1행은 헤더
+    seen_ids = set() if keep_ids else None
+    with tempfile.TemporaryDirectory() if replace else contextlib.nullcontext() as staging_dir:
+        staged = []
+        for chunk_no, chunk in enumerate(reader):
+            if chunk_no == 0:
+                required = REQUIRED_COLUMNS - {"프로젝트"}
+                if keep_ids: required |= {"ID"}
+                missing = required - set(chunk.columns)
+                if missing:
+                    raise ValueError(f"필수 컬럼 누락: {sorted(missing)}")
+            chunk_line = first_line
+            valid, bad = validate_chunk(chunk, first_line, default_project, keep_ids, seen_ids)
+            first_line += len(chunk)
+            for line, reason in bad:
+                result.add_error(line, reason)
+            if map_image is not None:
+                valid, failed = _map_images(valid, map_image)
+                for idx in failed:
+                    result.add_error(chunk_line + int(idx), "이미지 형식 오류")
+            if duplicates and len(valid):
+                # 앞 청크는 이미 커밋됐으므로 파일 안의 중복도 원장 조회로 잡힌다
+                suspects = ledger.find_duplicates(valid)
+                for idx, expense_id, reason in suspects.itertuples(index=False, name=None):
+                    if len(result.duplicates) < MAX_REPORTED_ERRORS:
+                        expense_id = None if pd.isna(expense_id) else int(expense_id)
+                        result.duplicates.append((chunk_line + int(idx), expense_id, reason))
+                result.rows_duplicate += suspects["행"].nunique()
+                if duplicates == "skip":
+                    valid = valid.drop(index=suspects["행"].unique())
+            if replace:
+                staged.append(os.path.join(staging_dir, f"{chunk_no}.pkl"))
+                valid.to_pickle(staged[-1])
+            else:
+                ledger.append(valid, keep_ids=keep_ids)
+            result.rows_ok += len(valid)
+            if on_chunk: on_chunk(chunk_no, result)
+        if replace:
+            # 스테이징 파일만 읽는 반복자라 쓰기 스레드에서 소비돼도 원장 서비스를 다시 부르지 않는다
+            ledger.replace_chunks((pd.read_pickle(path) for path in staged), keep_ids=keep_ids)
+    return result
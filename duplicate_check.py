@@ -0,0 +1,91 @@
+import threading
+
+# --- 중복 영수증 탐지 (지각 해시 해밍 인덱스, (참여자, 금액, 날짜) 인덱스) ---
+# 같은 영수증을 다시 찍거나 다른 해상도로 올려도 비슷한 값이 나오도록 이미지 구조로 64비트 해시를 만든다.
+PHASH_MAX_DISTANCE = 6  # 이 비트 수 이하로 다르면 같은 영수증으로 의심
+DATE_WINDOW_DAYS = 3    # 같은 참여자·금액이면서 날짜가 이 범위 안이면 의심
+_MASK = (1 << 64) - 1
+
+DUPLICATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS receipt_phash (
+    digest TEXT PRIMARY KEY,
+    phash  INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_expenses_traveler_amount_date ON expenses ("여행자", "금액", "날짜");
+CREATE INDEX IF NOT EXISTS idx_expenses_image ON expenses ("이미지");
+"""
+
+
+def dhash(img, size=8):
+    """차이 해시(dHash): 내용 영역을 회색조 (size+1)×size 로 줄여 가로로 이웃한 픽셀의 밝기 대소를 비트로 쓴다.
+
+    영수증은 대부분 흰 바탕이라 여백을 잘라 내고 대비를 늘린 뒤 계산한다.
+    """
+    from PIL import Image, ImageOps
+    gray = ImageOps.autocontrast(img.convert("L"))
+    bbox = gray.point(lambda p: 255 if p < 224 else 0).getbbox()
+    if bbox:
+        gray = gray.crop(bbox)
+    pixels = list(gray.resize((size + 1, size), Image.Resampling.LANCZOS).getdata())
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            value = (value << 1) | (left > pixels[row * (size + 1) + col + 1])
+    return value
+
+
+def is_informative(phash):
+    # 거의 빈 이미지는 해시 비트가 한쪽으로 몰려 서로 다른 영수증도 가깝게 나오므로 비교하지 않는다
+    return 4 < (phash & _MASK).bit_count() < 60
+
+
+def to_signed(value):
+    # SQLite INTEGER 는 부호 있는 64비트라 그대로 담을 수 있게 바꾼다
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def hamming(a, b):
+    return ((a ^ b) & _MASK).bit_count()
+
+
+class HammingIndex:
+    """해밍 거리 max_distance 이내의 64비트 해시를 찾는 다중 인덱스 해싱.
+
+    64비트를 max_distance + 1 조각으로 나누면 (비둘기집 원리) 조건을 만족하는 해시는 적어도 한 조각이
+    같다. 조각별 사전에서 후보만 모아 실제 거리를 재므로 전체 해시를 훑지 않는다.
+    """
+
+    def __init__(self, max_distance=PHASH_MAX_DISTANCE):
+        self.max_distance = max_distance
+        n = max_distance + 1
+        bounds = [64 * i // n for i in range(n + 1)]
+        self._slices = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(bounds, bounds[1:])]
+        self._tables = [{} for _ in self._slices]
+        self._size = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def add(self, value, item):
+        value &= _MASK
+        for table, (shift, mask) in zip(self._tables, self._slices):
+            table.setdefault((value >> shift) & mask, []).append((value, item))
+        self._size += 1
+
+    def search(self, value, max_distance=None):
+        """[(거리, 항목)] 을 거리 순으로 반환한다."""
+        max_distance = self.max_distance if max_distance is None else max_distance
+        if max_distance > self.max_distance:
+            raise ValueError(f"최대 {self.max_distance}비트까지만 찾을 수 있습니다.")
+        value &= _MASK
+        found, seen = [], set()
+        for table, (shift, mask) in zip(self._tables, self._slices):
+            for other, item in table.get((value >> shift) & mask, ()):
+                if item not in seen:
+                    seen.add(item)
+                    d = hamming(value, other)
+                    if d <= max_distance:
+                        found.append((d, item))
+        return sorted(found)
@@ -0,0 +1,4 @@
+# --- 한글 폰트 (Colab 환경) ---
+# 차트(matplotlib)와 PDF(fpdf)가 함께 쓴다. 어느 한쪽을 불러올 때 다른 라이브러리까지 불러오지 않도록 경로만 둔다.
+NANUM_FONT_PATH = "/usr/share/fonts/truetype/nanum/NanumGothic.ttf"
+NANUM_BOLD_PATH = "/usr/share/fonts/truetype/nanum/NanumGothicBold.ttf"
@@ -0,0 +1,186 @@
+"""원장을 청크 단위로 스트리밍해 CSV / 프로젝트별 Parquet·Arrow 파일로 내보내고 다시 불러온다.
+
+    python ledger_export.py expense_ledger.db ledger.csv --images exclude
+    python ledger_export.py expense_ledger.db export/ --format parquet
+"""
+import argparse
+import codecs
+import os
+import sys
+import tempfile
+import zipfile
+
+import pandas as pd
+
+from csv_import import ImportResult
+from ledger_store import DATE_FORMAT, LEDGER_COLUMNS, LedgerStore, apply_schema
+
+# --- 내보내기 ---
+EXPORT_CHUNKSIZE = 50_000
+# 이미지 컬럼 처리: 해시만 남기기(영수증 폴더와 함께 복원), 빼기, 영수증 원본을 ZIP 에 함께 넣기
+IMAGE_MODES = ("hash", "exclude", "files")
+# 프로젝트별 하위 디렉토리(프로젝트=<이름>/)에 쓰는 형식. Arrow IPC 는 압축하지 않아 메모리 맵으로 바로 읽힌다.
+PARTITION_FORMATS = {"parquet": ("parquet", ".parquet"), "arrow": ("ipc", ".arrow")}
+PARTITION_COLUMN = "프로젝트"
+
+
+def export_columns(images="hash"):
+    if images not in IMAGE_MODES:
+        raise ValueError(f"images 는 {IMAGE_MODES} 중 하나여야 합니다: {images}")
+    return LEDGER_COLUMNS if images != "exclude" else [c for c in LEDGER_COLUMNS if c != "이미지"]
+
+
+def _csv_bytes(chunk, header=False):
+    return chunk.to_csv(index=False, header=header, date_format=DATE_FORMAT).encode("utf-8")
+
+
+def iter_csv(ledger, images="hash", chunksize=EXPORT_CHUNKSIZE, project=None):
+    """원장을 CSV(utf-8-sig) 바이트 조각으로 차례로 만든다. 메모리에는 한 청크만 둔다."""
+    columns = export_columns(images)
+    yield codecs.BOM_UTF8 + _csv_bytes(pd.DataFrame(columns=columns), header=True)
+    for chunk in ledger.iter_chunks(project, columns, chunksize):
+        yield _csv_bytes(chunk)
+
+
+def write_csv(ledger, fileobj, images="hash", chunksize=EXPORT_CHUNKSIZE, project=None):
+    for part in iter_csv(ledger, images, chunksize, project):
+        fileobj.write(part)
+
+
+def write_csv_zip(ledger, fileobj, receipts, chunksize=EXPORT_CHUNKSIZE, project=None):
+    """expense_data.csv 와 거기서 쓰는 영수증 원본(receipts/<앞 2자리>/<해시>)을 ZIP 하나로 쓴다.
+
+    영수증은 저장소와 같은 배치라 receipts 폴더에 풀면 그대로 복원된다. 이미 압축된 이미지는 다시 압축하지 않는다.
+    """
+    digests = set()
+    with zipfile.ZipFile(fileobj, "w", zipfile.ZIP_DEFLATED) as zf:
+        with zf.open("expense_data.csv", "w", force_zip64=True) as f:
+            f.write(codecs.BOM_UTF8 + _csv_bytes(pd.DataFrame(columns=LEDGER_COLUMNS), header=True))
+            for chunk in ledger.iter_chunks(project, LEDGER_COLUMNS, chunksize):
+                f.write(_csv_bytes(chunk))
+                digests.update(chunk["이미지"].dropna())
+        for digest in sorted(digests):
+            if receipts.exists(digest):
+                zf.write(receipts.original_path(digest), f"receipts/{digest[:2]}/{digest}",
+                         compress_type=zipfile.ZIP_STORED)
+    return len(digests)
+
+
+def _arrow_schema(columns):
+    import pyarrow as pa
+    types = {"ID": pa.int64(), "날짜": pa.date32(), "금액": pa.int64(), "수량": pa.int64()}
+    return pa.schema([(c, types.get(c, pa.string())) for c in columns])
+
+
+def write_partitioned(ledger, out_dir, fmt="parquet", images="hash", chunksize=EXPORT_CHUNKSIZE):
+    """프로젝트별 하위 디렉토리(hive 형식 프로젝트=<이름>/)에 Parquet 또는 Arrow IPC 파일로 쓴다.
+
+    프로젝트 하나씩 인덱스로 읽어 청크 단위로 흘려 쓰므로 원장 전체를 메모리에 올리지 않는다.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    if fmt not in PARTITION_FORMATS:
+        raise ValueError(f"fmt 는 {list(PARTITION_FORMATS)} 중 하나여야 합니다: {fmt}")
+    if images == "files":
+        raise ValueError("분할 내보내기는 이미지를 해시로 두거나 빼기만 할 수 있습니다.")
+    columns = export_columns(images)
+    schema = _arrow_schema(columns)
+
+    def batches():
+        for project in sorted(ledger.distinct(PARTITION_COLUMN)):
+            for chunk in ledger.iter_chunks(project, columns, chunksize):
+                yield pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False)
+
+    file_format, suffix = PARTITION_FORMATS[fmt]
+    ds.write_dataset(pa.RecordBatchReader.from_batches(schema, batches()), out_dir, format=file_format,
+                     partitioning=_partitioning(), basename_template="part-{i}" + suffix,
+                     existing_data_behavior="delete_matching", max_rows_per_group=chunksize)
+
+
+def write_partitioned_zip(ledger, fileobj, fmt="parquet", images="hash", chunksize=EXPORT_CHUNKSIZE):
+    """write_partitioned 결과 디렉토리를 ZIP 하나로 묶는다. (내려받기용, 파일은 이미 압축돼 있어 저장만 한다)"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        write_partitioned(ledger, tmp_dir, fmt, images, chunksize)
+        with zipfile.ZipFile(fileobj, "w", zipfile.ZIP_STORED) as zf:
+            for root, _, files in os.walk(tmp_dir):
+                for name in sorted(files):
+                    path = os.path.join(root, name)
+                    zf.write(path, os.path.relpath(path, tmp_dir))
+
+
+# --- 다시 불러오기 ---
+def _partitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    # 프로젝트 이름이 숫자여도 문자열로 읽도록 파티션 타입을 고정한다
+    return ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive")
+
+
+def open_partitioned(path):
+    """write_partitioned 로 쓴 디렉토리를 pyarrow Dataset 으로 연다. 파일은 메모리 맵으로 읽는다.
+
+    Arrow IPC 파일은 압축되지 않아 읽은 버퍼가 맵된 파일을 그대로 가리킨다 (복사 없음).
+    """
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+    names = [n for _, _, files in os.walk(path) for n in files]
+    fmt = "ipc" if any(n.endswith(".arrow") for n in names) else "parquet"
+    return ds.dataset(path, format=fmt, partitioning=_partitioning(),
+                      filesystem=fs.LocalFileSystem(use_mmap=True))
+
+
+def _to_ledger_frame(table):
+    columns = [c for c in LEDGER_COLUMNS if c in table.column_names]
+    return apply_schema(table.to_pandas(split_blocks=True, self_destruct=True)[columns])
+
+
+def read_partitioned(path, project=None, columns=None):
+    """내보낸 디렉토리에서 (프로젝트를 골라) 원장 DataFrame 을 읽는다. 다른 프로젝트 파일은 열지 않는다."""
+    import pyarrow.dataset as ds
+    dataset = open_partitioned(path)
+    flt = ds.field(PARTITION_COLUMN) == project if project else None
+    return _to_ledger_frame(dataset.to_table(columns=list(columns) if columns else None, filter=flt))
+
+
+def import_partitioned(path, ledger, replace=False, chunksize=EXPORT_CHUNKSIZE):
+    """내보낸 디렉토리를 청크 단위로 원장에 넣고(ID 유지) ImportResult 를 반환한다.
+
+    replace=True 이면 비우기와 모든 청크를 한 트랜잭션으로 교체하므로, 읽다가 실패하면 원장은 그대로다.
+    """
+    import pyarrow as pa
+    dataset = open_partitioned(path)
+    frames = (_to_ledger_frame(pa.Table.from_batches([batch])) for batch in dataset.to_batches(batch_size=chunksize))
+    result = ImportResult()
+    if replace:
+        # 반복자는 메모리 맵 파일만 읽으므로 쓰기 스레드에서 소비돼도 된다
+        result.rows_ok = ledger.replace_chunks(frames, keep_ids=True)
+        return result
+    for frame in frames:
+        ledger.append(frame, keep_ids=True)
+        result.rows_ok += len(frame)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="경비 원장 내보내기 (CSV / 프로젝트별 Parquet·Arrow)")
+    parser.add_argument("ledger", help="원장 DB 파일")
+    parser.add_argument("out", help="CSV 파일 경로, 또는 분할 형식이면 출력 디렉토리")
+    parser.add_argument("--format", choices=["csv"] + list(PARTITION_FORMATS), default="csv")
+    parser.add_argument("--images", choices=["hash", "exclude"], default="hash", help="이미지(영수증 해시) 컬럼")
+    parser.add_argument("--chunksize", type=int, default=EXPORT_CHUNKSIZE)
+    args = parser.parse_args(argv)
+
+    ledger = LedgerStore(args.ledger)
+    try:
+        if args.format == "csv":
+            with open(args.out, "wb") as f:
+                write_csv(ledger, f, args.images, args.chunksize)
+        else:
+            write_partitioned(ledger, args.out, args.format, args.images, args.chunksize)
+    finally:
+        ledger.close()
+    print(f"내보내기 완료: {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
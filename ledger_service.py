@@ -0,0 +1,117 @@
+import itertools
+import queue
+import threading
+from concurrent.futures import Future
+
+import pandas as pd
+
+from ledger_store import normalize_rows
+
+# --- 공유 원장 서비스 (모든 세션이 한 프로세스 안에서 함께 쓴다) ---
+# 한 번에 모아 커밋할 최대 쓰기 요청 수
+MAX_WRITE_BATCH = 256
+
+_APPEND = "append"
+_CALL = "call"
+
+
+class LedgerService:
+    """LedgerStore 앞에 단일 쓰기 스레드를 두어 여러 세션의 쓰기를 큐로 직렬화한다.
+
+    큐에 연달아 쌓인 append 요청은 한 트랜잭션으로 묶어 커밋하고, 각 요청자에게 자기
+    행의 ID 를 돌려준다. 조회와 version() 은 저장소의 읽기 연결(WAL 스냅샷)로 바로 처리한다.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._run, name="ledger-writer", daemon=True)
+        self._writer.start()
+
+    def __getattr__(self, name):
+        # query, category_totals, distinct, get_setting, find_duplicates, version 등 읽기 메서드는 저장소에 맡긴다
+        return getattr(self.store, name)
+
+    def _submit(self, kind, payload):
+        future = Future()
+        self._queue.put((kind, payload, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < MAX_WRITE_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for kind, ops in itertools.groupby(batch, key=lambda op: op[0] if op else None):
+                if kind is None:
+                    return
+                if kind == _APPEND:
+                    self._commit_appends(list(ops))
+                else:
+                    for _, (fn, args, kwargs), future in ops:
+                        try:
+                            future.set_result(fn(*args, **kwargs))
+                        except Exception as e:
+                            future.set_exception(e)
+
+    def _commit_appends(self, ops):
+        frames = [frame for _, frame, _ in ops]
+        merged = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        try:
+            ids = self.store.append_normalized(merged)
+        except Exception as e:
+            for _, _, future in ops:
+                future.set_exception(e)
+            return
+        offset = 0
+        for _, frame, future in ops:
+            future.set_result(ids[offset:offset + len(frame)])
+            offset += len(frame)
+
+    def _call(self, fn, *args, **kwargs):
+        return self._submit(_CALL, (fn, args, kwargs)).result()
+
+    def append(self, rows, keep_ids=False):
+        """행을 쓰기 큐에 넣고 커밋될 때까지 기다려 ID 목록을 반환한다."""
+        if keep_ids:
+            return self._call(self.store.append, rows, keep_ids=True)
+        # 정규화는 요청한 세션 스레드에서 끝내 두고 쓰기 스레드는 INSERT 만 한다
+        frame = normalize_rows(rows)
+        if frame.empty:
+            return []
+        return self._submit(_APPEND, frame).result()
+
+    def clear(self):
+        return self._call(self.store.clear)
+
+    def delete_project(self, project):
+        return self._call(self.store.delete_project, project)
+
+    def replace_all(self, rows):
+        return self._call(self.store.replace_all, rows)
+
+    def replace_chunks(self, chunks, keep_ids=False):
+        # chunks 는 쓰기 스레드에서 소비되므로 원장 서비스를 다시 부르지 않는 반복자여야 한다
+        return self._call(self.store.replace_chunks, chunks, keep_ids)
+
+    def add_receipt_hashes(self, hashes):
+        return self._call(self.store.add_receipt_hashes, hashes)
+
+    def set_setting(self, key, value):
+        return self._call(self.store.set_setting, key, value)
+
+    def update_setting(self, key, update, default=None):
+        """설정값을 읽고 고쳐 쓰는 과정을 쓰기 스레드에서 한 번에 처리한다. (세션 간 덮어쓰기 방지)"""
+        def apply():
+            value = update(self.store.get_setting(key, default))
+            self.store.set_setting(key, value)
+            return value
+        return self._call(apply)
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join()
+        self.store.close()
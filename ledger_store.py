@@ -0,0 +1,609 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from duplicate_check import (DATE_WINDOW_DAYS, DUPLICATE_SCHEMA, PHASH_MAX_DISTANCE, HammingIndex,
+                             is_informative, to_signed)
+from search_index import SEARCH_SCHEMA, document_texts, normalize, postings, query_terms
+
+# --- 경비 원장 저장소 (SQLite) ---
+LEDGER_COLUMNS = ["ID", "프로젝트", "분류", "날짜", "금액", "설명", "여행자", "이미지", "수량", "비고"]
+# 날짜는 입력 시 한 번만 파싱해 ISO 문자열(YYYY-MM-DD)로 저장한다. 문자열 순서가 날짜 순서와 같아
+# (프로젝트, 날짜) 인덱스에서 기간 조회가 이진 탐색 범위 검색이 되고, 조회 결과는 datetime64 로 돌려준다.
+DATE_FORMAT = "%Y-%m-%d"
+DEFAULT_LEDGER_PATH = "expense_ledger.db"
+
+# 원장 DataFrame 스키마. 반복되는 텍스트(프로젝트/분류/여행자)는 category, 금액·수량은 int64,
+# 날짜는 datetime64, 이미지는 영수증 해시를 담는 nullable string(없으면 <NA>).
+LEDGER_DTYPES = {
+    "ID": "int64",
+    "프로젝트": "category",
+    "분류": "category",
+    "날짜": "datetime64[ns]",
+    "금액": "int64",
+    "설명": "string",
+    "여행자": "category",
+    "이미지": "string",
+    "수량": "int64",
+    "비고": "string",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS expenses (
+    "ID"     INTEGER PRIMARY KEY AUTOINCREMENT,
+    "프로젝트" TEXT NOT NULL,
+    "분류"   TEXT,
+    "날짜"   TEXT,
+    "금액"   INTEGER NOT NULL DEFAULT 0,
+    "설명"   TEXT,
+    "여행자" TEXT,
+    "이미지" TEXT,
+    "수량"   INTEGER NOT NULL DEFAULT 1,
+    "비고"   TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_expenses_project_date ON expenses ("프로젝트", "날짜");
+CREATE INDEX IF NOT EXISTS idx_expenses_project_category ON expenses ("프로젝트", "분류");
+CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses ("날짜");
+CREATE TABLE IF NOT EXISTS ledger_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO ledger_meta (key, value) VALUES ('version', 0);
+CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+# distinct 조회는 행 수 대신 키 수만큼만 읽도록 집계 테이블에서 가져온다
+_DISTINCT_SOURCES = {"프로젝트": "rollup_category", "분류": "rollup_category", "여행자": "rollup_traveler"}
+
+# 집계 테이블: 경비 행이 추가/삭제될 때 트리거가 해당 키 한 줄만 갱신한다 (금액 × 수량 기준)
+_ROLLUP_KEYS = {
+    "rollup_category": ("프로젝트", "분류"),
+    "rollup_daily": ("프로젝트", "날짜", "분류"),
+    "rollup_traveler": ("프로젝트", "여행자"),
+}
+
+
+def _rollup_schema():
+    parts, on_insert, on_delete = [], [], []
+    for table, keys in _ROLLUP_KEYS.items():
+        cols = ", ".join(_quote(k) for k in keys)
+        parts.append(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            + "".join(f"{_quote(k)} TEXT NOT NULL, " for k in keys)
+            + f"total INTEGER NOT NULL DEFAULT 0, n INTEGER NOT NULL DEFAULT 0, PRIMARY KEY ({cols}));")
+        new_vals = ", ".join(f"COALESCE(NEW.{_quote(k)}, '')" for k in keys)
+        on_insert.append(
+            f"INSERT INTO {table} ({cols}, total, n) VALUES ({new_vals}, NEW.\"금액\" * NEW.\"수량\", 1) "
+            f"ON CONFLICT ({cols}) DO UPDATE SET total = total + excluded.total, n = n + 1;")
+        match = " AND ".join(f"{_quote(k)} = COALESCE(OLD.{_quote(k)}, '')" for k in keys)
+        on_delete.append(
+            f"UPDATE {table} SET total = total - OLD.\"금액\" * OLD.\"수량\", n = n - 1 WHERE {match};"
+            f"DELETE FROM {table} WHERE n <= 0 AND {match};")
+    parts.append("CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_insert AFTER INSERT ON expenses BEGIN "
+                 + " ".join(on_insert) + " END;")
+    parts.append("CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_delete AFTER DELETE ON expenses BEGIN "
+                 + " ".join(on_delete) + " END;")
+    return "\n".join(parts)
+
+
+def _quote(col):
+    return '"' + col.replace('"', '""') + '"'
+
+
+def _text_column(df, col):
+    if col not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    values = df[col]
+    return values.astype(object).where(values.notna(), "").astype(str)
+
+
+def _int_column(df, col, default):
+    if col not in df.columns:
+        return pd.Series(default, index=df.index, dtype="int64")
+    values = df[col].replace("", None) if df[col].dtype == object else df[col]
+    return pd.to_numeric(values).fillna(default)
+
+
+def parse_dates(values):
+    """날짜 값(문자열, date, datetime)을 datetime64 로 바꾼다. 해석할 수 없으면 NaT."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.normalize()
+    text = values.astype(object).where(values.notna(), "").astype(str).str.strip()
+    text = text.str.replace(r"[./]", "-", regex=True)
+    return pd.to_datetime(text.where(text != "", None), errors="coerce", format="mixed").dt.normalize()
+
+
+def apply_schema(df):
+    """원장 컬럼을 LEDGER_DTYPES 로 맞춘 새 DataFrame 을 반환한다. 스키마에 없는 컬럼은 그대로 둔다.
+
+    금액·수량·ID 가 숫자가 아니거나 정수가 아니면 ValueError. ID 에 빈 값이 있으면 Int64 로 둔다.
+    """
+    columns = {}
+    for col in df.columns:
+        dtype = LEDGER_DTYPES.get(col)
+        values = df[col]
+        if dtype == "int64":
+            numbers = pd.to_numeric(values.replace("", None) if values.dtype == object else values)
+            if (numbers.notna() & (numbers != numbers.round())).any():
+                raise ValueError(f"{col} 컬럼에 정수가 아닌 값이 있습니다.")
+            values = numbers.astype("Int64" if numbers.isna().any() else "int64")
+        elif dtype == "category":
+            if not isinstance(values.dtype, pd.CategoricalDtype) or values.isna().any():
+                values = values.astype("string").fillna("").astype("category")
+        elif dtype == "string":
+            values = values.astype("string").fillna("")
+            if col == "이미지":
+                values = values.mask(values == "")
+        elif dtype is not None:
+            values = parse_dates(values).astype(dtype)
+        columns[col] = values
+    return pd.DataFrame(columns, index=df.index)
+
+
+def normalize_rows(rows):
+    """dict/dict 목록/DataFrame 을 저장소 컬럼 순서와 LEDGER_DTYPES 로 맞춘다.
+
+    빈 프로젝트는 "기본 프로젝트", 빈 금액은 0, 빈 수량은 1 로 채운다.
+    """
+    if isinstance(rows, dict):
+        rows = [rows]
+    df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+    project = _text_column(df, "프로젝트")
+    dates = parse_dates(df["날짜"]) if "날짜" in df.columns else pd.Series(pd.NaT, index=df.index)
+    out = pd.DataFrame({
+        "ID": pd.to_numeric(df["ID"]) if "ID" in df.columns else pd.Series(None, index=df.index, dtype=float),
+        "프로젝트": project.where(project != "", "기본 프로젝트"),
+        "분류": _text_column(df, "분류"),
+        "날짜": dates,
+        "금액": _int_column(df, "금액", 0),
+        "설명": _text_column(df, "설명"),
+        "여행자": _text_column(df, "여행자"),
+        "이미지": _text_column(df, "이미지"),
+        "수량": _int_column(df, "수량", 1),
+        "비고": _text_column(df, "비고"),
+    }, index=df.index)
+    return apply_schema(out[LEDGER_COLUMNS])
+
+
+class LedgerStore:
+    """경비 원장을 SQLite 파일에 저장하고, 필터를 쿼리로 내려 보내 조회한다.
+
+    삽입은 append-only 이며 ID 는 AUTOINCREMENT 시퀀스에서 발급되므로
+    프로젝트를 삭제해도 이미 쓰인 ID 가 재사용되지 않는다. 쓰기는 한 연결에서 직렬화하고,
+    읽기는 별도 연결 풀에서 WAL 스냅샷으로 처리해 쓰기 중에도 막히지 않는다.
+    쓰기 트랜잭션마다 ledger_meta 의 version 이 1 씩 오른다.
+    """
+
+    def __init__(self, path=DEFAULT_LEDGER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self._phash_index = HammingIndex()
+        self._phash_rowid = 0  # 해밍 인덱스에 넣은 receipt_phash 의 마지막 rowid
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        has_rollups = self._has_table("rollup_category")
+        has_search = self._has_table("search_docs")
+        self._conn.executescript(_SCHEMA)
+        self._conn.executescript(_rollup_schema())
+        self._conn.executescript(SEARCH_SCHEMA)
+        self._conn.executescript(DUPLICATE_SCHEMA)
+        if not has_rollups:
+            self._rebuild_rollups()
+        if not has_search:
+            self._rebuild_search()
+        self._conn.commit()
+
+    def _has_table(self, name):
+        return self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+    def _rebuild_search(self, chunksize=50_000):
+        # 검색 색인(또는 정규화 본문) 도입 전에 만든 원장 파일은 한 번 전체를 색인한다
+        self._conn.execute("DELETE FROM search_postings")
+        self._conn.execute("DELETE FROM search_docs")
+        reader = pd.read_sql_query('SELECT "ID", "설명", "비고" FROM expenses', self._conn, chunksize=chunksize)
+        for chunk in reader:
+            self._index_text(self._conn, chunk["ID"].tolist(), chunk)
+
+    @contextmanager
+    def _reader(self):
+        with self._readers_lock:
+            conn = self._readers.pop() if self._readers else None
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+        try:
+            yield conn
+        finally:
+            with self._readers_lock:
+                self._readers.append(conn)
+
+    def _bump_version(self, cur):
+        cur.execute("UPDATE ledger_meta SET value = value + 1 WHERE key = 'version'")
+
+    def version(self):
+        """원장/설정이 바뀔 때마다 증가하는 번호. 조회 캐시의 키로 쓴다."""
+        with self._reader() as conn:
+            return conn.execute("SELECT value FROM ledger_meta WHERE key = 'version'").fetchone()[0]
+
+    def _rebuild_rollups(self):
+        # 집계 테이블 도입 전에 만든 원장 파일은 한 번 전체 집계로 채운다
+        for table, keys in _ROLLUP_KEYS.items():
+            cols = ", ".join(_quote(k) for k in keys)
+            key_exprs = ", ".join(f"COALESCE({_quote(k)}, '')" for k in keys)
+            self._conn.execute(f"DELETE FROM {table}")
+            self._conn.execute(
+                f"INSERT INTO {table} ({cols}, total, n) "
+                f'SELECT {key_exprs}, SUM("금액" * "수량"), COUNT(*) FROM expenses GROUP BY {key_exprs}')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers = []
+
+    def append(self, rows, keep_ids=False):
+        """경비 행(dict, dict 목록, DataFrame)을 한 트랜잭션으로 추가하고 ID 목록을 반환한다.
+
+        keep_ids=True 이면 행의 ID 를 그대로 쓰고, 비어 있는 ID 만 시퀀스에서 발급한다.
+        """
+        return self.append_normalized(normalize_rows(rows), keep_ids)
+
+    def append_normalized(self, frame, keep_ids=False):
+        """normalize_rows 를 거친 DataFrame 을 그대로 INSERT 한다."""
+        if frame.empty:
+            return []
+        with self._lock, self._conn:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            ids = self._insert(cur, frame, keep_ids)
+            self._bump_version(cur)
+        return ids
+
+    def _insert(self, cur, frame, keep_ids):
+        # 이미 열린 쓰기 트랜잭션 안에서 행과 검색 색인을 넣고 ID 목록을 반환한다
+        cols = LEDGER_COLUMNS if keep_ids else LEDGER_COLUMNS[1:]
+        sql = "INSERT INTO expenses ({}) VALUES ({})".format(
+            ", ".join(_quote(c) for c in cols), ", ".join("?" for _ in cols))
+        # sqlite3 는 numpy 스칼라를 바인딩하지 못하므로 파이썬 객체로 바꿔 넘긴다 (날짜는 ISO 문자열)
+        values = frame[cols].astype(object).where(frame[cols].notna(), None)
+        if pd.api.types.is_datetime64_any_dtype(frame["날짜"]):
+            dates = frame["날짜"].dt.strftime(DATE_FORMAT)
+            values["날짜"] = dates.astype(object).where(dates.notna(), None)
+        if keep_ids:
+            ids = []
+            for row in values.itertuples(index=False, name=None):
+                cur.execute(sql, row)
+                ids.append(cur.lastrowid)
+        else:
+            # 잠금을 잡은 한 트랜잭션 안에서는 AUTOINCREMENT 가 연속된 ID 를 발급한다
+            row = cur.execute("SELECT seq FROM sqlite_sequence WHERE name = 'expenses'").fetchone()
+            start = (row[0] if row else 0) + 1
+            cur.executemany(sql, values.itertuples(index=False, name=None))
+            ids = list(range(start, start + len(frame)))
+        self._index_text(cur, ids, frame)
+        return ids
+
+    def _index_text(self, cur, ids, frame):
+        texts = document_texts(frame)
+        cur.executemany("INSERT INTO search_postings (gram, doc, tf) VALUES (?, ?, ?)", postings(ids, texts))
+        cur.executemany("INSERT INTO search_docs (doc, text) VALUES (?, ?)",
+                        zip(ids, map(normalize, texts)))
+
+    def clear(self):
+        with self._lock, self._conn:
+            # 색인을 먼저 비우면 삭제 트리거가 빈 테이블만 찾는다
+            self._conn.execute("DELETE FROM search_postings")
+            self._conn.execute("DELETE FROM search_docs")
+            self._conn.execute("DELETE FROM expenses")
+            self._bump_version(self._conn)
+
+    def _where(self, project=None, start=None, end=None, category=None, traveler=None):
+        clauses, params = [], []
+        if isinstance(project, (list, tuple, set)):
+            project = list(project)
+            clauses.append(f"\"프로젝트\" IN ({', '.join('?' for _ in project)})")
+            params.extend(project)
+        elif project and project != "전체 프로젝트":
+            clauses.append('"프로젝트" = ?')
+            params.append(project)
+        if start is not None:
+            clauses.append('"날짜" >= ?')
+            params.append(pd.Timestamp(start).strftime(DATE_FORMAT))
+        if end is not None:
+            clauses.append('"날짜" <= ?')
+            params.append(pd.Timestamp(end).strftime(DATE_FORMAT))
+        for col, value in (("분류", category), ("여행자", traveler)):
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                value = list(value)
+                clauses.append(f"{_quote(col)} IN ({', '.join('?' for _ in value)})")
+                params.extend(value)
+            else:
+                clauses.append(f"{_quote(col)} = ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _read_frame(self, sql, params, columns):
+        parse = {"날짜": {"format": DATE_FORMAT}} if "날짜" in columns else None
+        with self._reader() as conn:
+            df = pd.read_sql_query(sql, conn, params=params, parse_dates=parse)
+        return apply_schema(df)
+
+    def query(self, project=None, start=None, end=None, category=None, traveler=None, columns=None):
+        """조건에 맞는 경비를 ID 순으로 DataFrame 으로 반환한다."""
+        columns = list(columns) if columns else LEDGER_COLUMNS
+        where, params = self._where(project, start, end, category, traveler)
+        sql = f"SELECT {', '.join(_quote(c) for c in columns)} FROM expenses{where} ORDER BY \"ID\""
+        return self._read_frame(sql, params, columns)
+
+    def iter_chunks(self, project=None, columns=None, chunksize=50_000):
+        """조건에 맞는 경비를 ID 순으로 chunksize 행씩 DataFrame 으로 내놓는다. (내보내기용)
+
+        한 읽기 연결의 SELECT 하나로 읽으므로 도중에 쓰기가 있어도 시작 시점의 스냅샷이 유지된다.
+        """
+        columns = list(columns) if columns else LEDGER_COLUMNS
+        where, params = self._where(project)
+        sql = f"SELECT {', '.join(_quote(c) for c in columns)} FROM expenses{where} ORDER BY \"ID\""
+        parse = {"날짜": {"format": DATE_FORMAT}} if "날짜" in columns else None
+        with self._reader() as conn:
+            for chunk in pd.read_sql_query(sql, conn, params=params, parse_dates=parse, chunksize=chunksize):
+                yield apply_schema(chunk)
+
+    def page(self, project=None, start=None, end=None, category=None, traveler=None,
+             sort_by="ID", descending=False, limit=50, offset=0, columns=None):
+        """조건에 맞는 경비를 정렬해 한 페이지(LIMIT/OFFSET)만 읽는다. 같은 값은 ID 순으로 잇는다."""
+        if sort_by not in LEDGER_COLUMNS:
+            raise ValueError(f"정렬할 수 없는 컬럼: {sort_by}")
+        columns = list(columns) if columns else LEDGER_COLUMNS
+        where, params = self._where(project, start, end, category, traveler)
+        order = "DESC" if descending else "ASC"
+        sql = (f"SELECT {', '.join(_quote(c) for c in columns)} FROM expenses{where} "
+               f"ORDER BY {_quote(sort_by)} {order}, \"ID\" {order} LIMIT ? OFFSET ?")
+        return self._read_frame(sql, params + [int(limit), int(offset)], columns)
+
+    def get(self, expense_id):
+        """ID(기본 키)로 경비 한 건을 찾아 Series 로 반환한다. 없으면 None."""
+        sql = f"SELECT {', '.join(_quote(c) for c in LEDGER_COLUMNS)} FROM expenses WHERE \"ID\" = ?"
+        df = self._read_frame(sql, [int(expense_id)], LEDGER_COLUMNS)
+        return df.iloc[0] if len(df) else None
+
+    def rows(self, ids, columns=None):
+        """ID 목록의 경비를 주어진 순서대로 반환한다. (검색 결과 페이지 등)"""
+        columns = list(columns) if columns else LEDGER_COLUMNS
+        ids = [int(i) for i in ids]
+        if not ids:
+            return apply_schema(pd.DataFrame({c: [] for c in columns}))
+        select = columns if "ID" in columns else ["ID"] + columns
+        sql = (f"SELECT {', '.join(_quote(c) for c in select)} FROM expenses "
+               f"WHERE \"ID\" IN ({', '.join('?' for _ in ids)})")
+        df = self._read_frame(sql, ids, select)
+        # 요청 순서로 고르되, 그 사이 지워진 ID 는 빼고 컬럼 타입은 그대로 둔다 (reindex 는 NaN 으로 int 가 float 이 됨)
+        pos = pd.Index(df["ID"]).get_indexer(ids)
+        return df.iloc[pos[pos >= 0]].reset_index(drop=True)[columns]
+
+    def search(self, text, project=None, start=None, end=None, category=None, traveler=None, limit=1000):
+        """설명/비고에서 검색어(공백으로 나눈 단어 모두)를 포함한 경비를 찾아 관련도 순 ID 목록을 반환한다.
+
+        바이그램 색인으로 후보를 고른 뒤 실제 부분 문자열 포함 여부를 확인하고, 찾은 단어의
+        출현 횟수 / 문서 길이로 점수를 매긴다. 원장 필터(프로젝트, 기간, 분류, 참여자)가 함께 적용된다.
+        """
+        terms, grams = query_terms(text)
+        if not terms:
+            return []
+        where, params = self._where(project, start, end, category, traveler)
+        # 포함 여부는 색인과 같은 정규화를 거친 본문(search_docs)에서 확인한다
+        if grams:
+            # 두 글자 단어는 바이그램 일치가 곧 포함이므로 부분 문자열 검사를 생략한다
+            terms = [t for t in terms if len(t) != 2]
+            with self._reader() as conn:
+                grams = self._rarest_first(conn, grams)
+            # 가장 드문 바이그램의 문서 목록에서 출발해 나머지는 (gram, doc) 기본 키로 확인한다
+            joins = "".join(f" CROSS JOIN search_postings p{i} ON p{i}.gram = ? AND p{i}.doc = p0.doc"
+                            for i in range(1, len(grams)))
+            tf_sum = " + ".join(f"p{i}.tf" for i in range(len(grams)))
+            sql = (f"SELECT e.\"ID\", ({tf_sum}) * 1.0 / (LENGTH(d.text) + 1) AS score "
+                   f"FROM search_postings p0{joins} CROSS JOIN expenses e ON e.\"ID\" = p0.doc "
+                   f"CROSS JOIN search_docs d ON d.doc = p0.doc "
+                   f"WHERE p0.gram = ?{where.replace(' WHERE ', ' AND ', 1)}"
+                   f"{''.join(' AND instr(d.text, ?) > 0' for _ in terms)} "
+                   f"ORDER BY score DESC, e.\"ID\" DESC LIMIT ?")
+            params = grams[1:] + grams[:1] + params + terms + [int(limit)]
+        else:
+            # 한 글자 검색어뿐이면 색인을 쓸 수 없어 필터 범위 안에서 직접 찾는다
+            contains = " AND ".join("instr(d.text, ?) > 0" for _ in terms)
+            sql = (f"SELECT \"ID\", 1.0 / (LENGTH(d.text) + 1) AS score "
+                   f"FROM expenses JOIN search_docs d ON d.doc = expenses.\"ID\"{where}"
+                   f"{' AND ' if where else ' WHERE '}{contains} ORDER BY score DESC, \"ID\" DESC LIMIT ?")
+            params = params + terms + [int(limit)]
+        with self._reader() as conn:
+            return [r[0] for r in conn.execute(sql, params).fetchall()]
+
+    @staticmethod
+    def _rarest_first(conn, grams, cap=10_000):
+        # 문서 수를 cap 까지만 세어 (색인 범위 검색) 드문 바이그램부터 정렬한다
+        sql = "SELECT COUNT(*) FROM (SELECT 1 FROM search_postings WHERE gram = ? LIMIT ?)"
+        return sorted(grams, key=lambda g: conn.execute(sql, (g, cap)).fetchone()[0])
+
+    def count(self, project=None, start=None, end=None, category=None, traveler=None):
+        where, params = self._where(project, start, end, category, traveler)
+        with self._reader() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM expenses{where}", params).fetchone()[0]
+
+    def date_range(self, project=None):
+        where, params = self._where(project)
+        with self._reader() as conn:
+            first, last = conn.execute(
+                f'SELECT MIN("날짜"), MAX("날짜") FROM expenses{where}', params).fetchone()
+        if first is None:
+            return None, None
+        return pd.Timestamp(first), pd.Timestamp(last)
+
+    def _rollup(self, table, group_by, project=None, start=None, end=None):
+        where, params = self._where(project, start, end)
+        sql = (f"SELECT {_quote(group_by)}, SUM(total) FROM {table}{where} "
+               f"GROUP BY {_quote(group_by)} ORDER BY {_quote(group_by)}")
+        with self._reader() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return pd.Series({k: v for k, v in rows}, name="금액", dtype="int64").rename_axis(group_by)
+
+    def category_totals(self, project=None, start=None, end=None):
+        """분류별 집행액(금액 × 수량). 기간이 주어지면 일자별 집계에서 합산한다."""
+        if start is None and end is None:
+            return self._rollup("rollup_category", "분류", project)
+        return self._rollup("rollup_daily", "분류", project, start, end)
+
+    def date_totals(self, project=None, start=None, end=None):
+        totals = self._rollup("rollup_daily", "날짜", project, start, end)
+        totals = totals[totals.index != ""]
+        totals.index = pd.to_datetime(totals.index, format=DATE_FORMAT).rename("날짜")
+        return totals
+
+    def traveler_totals(self, project=None):
+        return self._rollup("rollup_traveler", "여행자", project)
+
+    def storage_stats(self):
+        """(행 수, 컬럼별 저장 바이트 Series, DB+WAL 파일 크기). 전체를 훑으므로 진단 화면에서만 쓴다."""
+        sums = ", ".join(f"COALESCE(SUM(LENGTH(CAST({_quote(c)} AS BLOB))), 0)" for c in LEDGER_COLUMNS)
+        with self._reader() as conn:
+            rows, *col_bytes = conn.execute(f"SELECT COUNT(*), {sums} FROM expenses").fetchone()
+        files = sum(os.path.getsize(p) for p in (self.path, self.path + "-wal") if os.path.exists(p))
+        return rows, pd.Series(col_bytes, index=LEDGER_COLUMNS, name="바이트", dtype="int64"), files
+
+    def distinct(self, column):
+        table = _DISTINCT_SOURCES.get(column, "expenses")
+        with self._reader() as conn:
+            rows = conn.execute(
+                f"SELECT DISTINCT {_quote(column)} FROM {table} WHERE {_quote(column)} <> ''").fetchall()
+        return [r[0] for r in rows if r[0] is not None]
+
+    def delete_project(self, project):
+        with self._lock, self._conn:
+            deleted = self._conn.execute('DELETE FROM expenses WHERE "프로젝트" = ?', (project,)).rowcount
+            self._bump_version(self._conn)
+            return deleted
+
+    def replace_all(self, rows):
+        """원장을 비우고 주어진 행(기존 ID 유지)으로 교체한다."""
+        return self.replace_chunks([rows], keep_ids=True)
+
+    def replace_chunks(self, chunks, keep_ids=False):
+        """원장을 비우고 chunks(행 묶음들을 차례로 내놓는 반복자)로 교체한 뒤 행 수를 반환한다.
+
+        비우기부터 마지막 청크까지 한 트랜잭션이라, 도중에 예외가 나면 원래 원장이 그대로 남는다.
+        읽기 연결은 커밋 전까지 이전 원장을 본다.
+        """
+        with self._lock, self._conn:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute("DELETE FROM search_postings")
+            cur.execute("DELETE FROM search_docs")
+            cur.execute("DELETE FROM expenses")
+            total = 0
+            for rows in chunks:
+                frame = normalize_rows(rows)
+                if not frame.empty:
+                    total += len(self._insert(cur, frame, keep_ids))
+            self._bump_version(cur)
+        return total
+
+    def get_setting(self, key, default=None):
+        """예산·분류·프로젝트 목록처럼 모든 세션이 함께 쓰는 설정값(JSON)을 읽는다."""
+        with self._reader() as conn:
+            row = conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_setting(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO settings (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (key, json.dumps(value, ensure_ascii=False)))
+            self._bump_version(self._conn)
+
+    # --- 중복 청구 의심 탐지 ---
+    def add_receipt_hashes(self, hashes):
+        """{영수증 해시: 지각 해시} 를 기록한다. 조회 결과는 바뀌지 않으므로 버전은 그대로 둔다."""
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO receipt_phash (digest, phash) VALUES (?, ?)",
+                                   [(digest, to_signed(phash)) for digest, phash in hashes.items()])
+
+    def _similar_receipts(self, conn, phashes, max_distance):
+        # 지난 조회 이후 기록된 지각 해시만 인덱스에 더한다 (rowid 는 계속 증가한다)
+        index = self._phash_index
+        with index.lock:
+            rows = conn.execute("SELECT rowid, digest, phash FROM receipt_phash WHERE rowid > ? ORDER BY rowid",
+                                (self._phash_rowid,)).fetchall()
+            for _, digest, phash in rows:
+                index.add(phash, digest)
+            if rows:
+                self._phash_rowid = rows[-1][0]
+            return {digest: index.search(phash, max_distance) for digest, phash in phashes.items()
+                    if is_informative(phash)}
+
+    @staticmethod
+    def _select_in(conn, sql, values, size=900):
+        # IN (...) 목록을 바인딩 변수 한도 안에서 나눠 조회한다
+        values = list(values)
+        for i in range(0, len(values), size):
+            part = values[i:i + size]
+            yield from conn.execute(sql.format(", ".join("?" for _ in part)), part)
+
+    def find_duplicates(self, rows, days=DATE_WINDOW_DAYS, max_distance=PHASH_MAX_DISTANCE):
+        """등록하려는 행 가운데 이미 청구된 것으로 보이는 행을 [행, ID, 사유] DataFrame 으로 반환한다.
+
+        행은 rows 의 인덱스, ID 는 겹치는 기존 경비다(같은 등록분 안의 중복이면 빈 값). 같은 영수증 이미지,
+        지각 해시가 max_distance 비트 이내이면서 금액이 같고 날짜가 ±days 일 안인 영수증, 같은
+        참여자·금액이면서 날짜가 ±days 일 안인 경비를 찾는다. 모두 DB 인덱스와 해밍 인덱스 조회라 원장이 커져도 행마다 전체를 훑지 않는다.
+        """
+        frame = normalize_rows(rows)
+        images = frame["이미지"].dropna()
+        keyed = frame[(frame["금액"] > 0) & frame["날짜"].notna() & (frame["여행자"].astype(str) != "")]
+        found = []
+        with self._reader() as conn:
+            if len(images):
+                digests = set(images)
+                phashes = dict(self._select_in(conn, "SELECT digest, phash FROM receipt_phash WHERE digest IN ({})", digests))
+                similar = self._similar_receipts(conn, phashes, max_distance)
+                claimed = {}
+                candidates = digests | {other for matches in similar.values() for _, other in matches}
+                for digest, expense_id, amount, date in self._select_in(
+                        conn, 'SELECT "이미지", "ID", "금액", "날짜" FROM expenses WHERE "이미지" IN ({})', candidates):
+                    claimed.setdefault(digest, []).append((expense_id, amount, pd.Timestamp(date)))
+                for idx, digest in images.items():
+                    found.extend((idx, expense_id, "같은 영수증 이미지") for expense_id, _, _ in claimed.get(digest, []))
+                    # 양식이 같은 다른 영수증도 해시가 가까우므로 금액과 날짜(±days 일)가 모두 맞을 때만 의심한다
+                    amount, date = frame.at[idx, "금액"], frame.at[idx, "날짜"]
+                    for distance, other in similar.get(digest, []):
+                        if other != digest:
+                            found.extend((idx, expense_id, f"비슷한 영수증 이미지 (차이 {distance}비트)")
+                                         for expense_id, other_amount, other_date in claimed.get(other, [])
+                                         if other_amount == amount and abs((other_date - date).days) <= days)
+            # (참여자, 금액, 날짜) 인덱스에서 행마다 날짜 범위 검색 한 번
+            dates = keyed["날짜"]
+            probes = list(zip(range(len(keyed)), keyed["여행자"].astype(str), keyed["금액"].astype(int),
+                              (dates - pd.Timedelta(days=days)).dt.strftime(DATE_FORMAT),
+                              (dates + pd.Timedelta(days=days)).dt.strftime(DATE_FORMAT)))
+            for i in range(0, len(probes), 500):
+                part = probes[i:i + 500]
+                sql = ("WITH probe (pos, traveler, amount, lo, hi) AS (VALUES "
+                       + ", ".join("(?, ?, ?, ?, ?)" for _ in part) + ") "
+                       'SELECT probe.pos, e."ID", e."날짜" FROM probe CROSS JOIN expenses e '
+                       'ON e."여행자" = probe.traveler AND e."금액" = probe.amount AND e."날짜" BETWEEN probe.lo AND probe.hi')
+                for pos, expense_id, date in conn.execute(sql, [v for probe in part for v in probe]):
+                    found.append((keyed.index[pos], expense_id, f"같은 참여자·금액 ({date})"))
+        # 같은 등록분 안에서 겹치는 행은 앞선 행만 남기고 뒤의 행을 표시한다
+        found.extend((idx, None, "이번 등록분에 같은 영수증 이미지") for idx in images.index[images.duplicated()])
+        ordered = keyed[["여행자", "금액", "날짜"]].astype({"여행자": str}).sort_values(["여행자", "금액", "날짜"], kind="stable")
+        prev = ordered.shift()
+        near = ((ordered["여행자"] == prev["여행자"]) & (ordered["금액"] == prev["금액"])
+                & ((ordered["날짜"] - prev["날짜"]).dt.days <= days))
+        found.extend((idx, None, "이번 등록분에 같은 참여자·금액") for idx in ordered.index[near])
+        out = pd.DataFrame(found, columns=["행", "ID", "사유"]).drop_duplicates(["행", "ID"])
+        out["ID"] = out["ID"].astype("Int64")
+        return out.reset_index(drop=True)
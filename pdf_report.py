@@ -0,0 +1,239 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from fpdf import FPDF
+
+from fonts import NANUM_BOLD_PATH, NANUM_FONT_PATH
+
+REPORT_CACHE_SIZE = 8
+
+# 폰트 파싱 결과(글자 폭 테이블 등)는 프로세스 안에서 한 번만 만든다
+_font_cache = {}
+_font_lock = threading.Lock()
+
+
+class _GlyphSubset(list):
+    """FPDF 1.7 은 출력한 글자마다 subset 에 append 하고 폰트를 넣을 때 `in` 으로 찾는다.
+
+    중복을 버리고 집합으로 찾게 해서, 보고서 길이가 길어져도 폰트 삽입 시간이
+    (쓰인 글자 수 × 전체 출력 글자 수) 로 늘어나지 않게 한다.
+    """
+
+    def __init__(self, iterable=()):
+        super().__init__()
+        self._seen = set()
+        for code in iterable:
+            self.append(code)
+
+    def append(self, code):
+        if code not in self._seen:
+            self._seen.add(code)
+            super().append(code)
+
+    def __contains__(self, code):
+        return code in self._seen
+
+
+def _add_cached_font(pdf, family, style, path):
+    fontkey = family.lower() + style
+    with _font_lock:
+        cached = _font_cache.get((fontkey, path))
+        if cached is None:
+            pdf.add_font(family, style, path, uni=True)
+            _font_cache[(fontkey, path)] = (dict(pdf.fonts[fontkey]), dict(pdf.font_files[fontkey]))
+            pdf.fonts[fontkey]["subset"] = _GlyphSubset(pdf.fonts[fontkey]["subset"])
+            return
+    font, font_file = cached
+    # subset 은 문서마다 쓰인 글자를 모으므로 새로 시작한다
+    first_chars = 57 if hasattr(pdf, "str_alias_nb_pages") else 32
+    pdf.fonts[fontkey] = dict(font, i=len(pdf.fonts) + 1, subset=_GlyphSubset(range(0, first_chars)))
+    pdf.font_files[fontkey] = dict(font_file)
+    pdf.font_files[path] = {"type": "TTF"}
+
+
+class _StreamBuffer:
+    """FPDF.buffer 자리에 넣어 문서 본문을 메모리에 모으지 않고 바로 스트림에 쓴다.
+
+    FPDF 는 객체 오프셋을 len(self.buffer) 로 계산하므로 쓴 바이트 수를 길이로 돌려준다.
+    """
+
+    def __init__(self, f):
+        self._f = f
+        self._size = 0
+
+    def __iadd__(self, s):
+        data = s.encode("latin1")
+        self._f.write(data)
+        self._size += len(data)
+        return self
+
+    def __len__(self):
+        return self._size
+
+
+# --- PDF 보고서 클래스 ---
+class ExpenseReportPDF(FPDF):
+    def __init__(self, title="예산 집행내역서", project="", period=""):
+        super().__init__(orientation='L', unit='mm', format='A4')
+        self.report_title = title
+        self.project = project
+        self.period = period
+        _add_cached_font(self, "NanumGothic", "", NANUM_FONT_PATH)
+        _add_cached_font(self, "NanumGothic", "B", NANUM_BOLD_PATH)
+        _add_cached_font(self, "NanumGothic", "I", NANUM_FONT_PATH)
+        self.set_auto_page_break(auto=True, margin=15)
+        self._page_parts = {}
+
+    def _out(self, s):
+        # 페이지 내용은 문자열 += 대신 리스트에 모아 두고 문서를 닫을 때 합친다
+        if self.state == 2:
+            self._page_parts.setdefault(self.page, []).append(s if isinstance(s, str) else str(s))
+        else:
+            super()._out(s)
+
+    def _putpages(self):
+        for n, parts in self._page_parts.items():
+            self.pages[n] += "\n".join(parts) + "\n"
+        self._page_parts = {}
+        super()._putpages()
+
+    def header(self):
+        self.set_font("NanumGothic", "B", 15)
+        self.cell(0, 12, self.report_title, 0, 1, "C")
+        self.set_font("NanumGothic", "", 11)
+        if self.project:
+            self.cell(0, 7, f"프로젝트/행사명 : {self.project}", 0, 1)
+        if self.period:
+            self.cell(0, 7, f"활동 기간 : {self.period}", 0, 1)
+        self.ln(3)
+
+    def footer(self):
+        self.set_y(-13)
+        self.set_font("NanumGothic", "I", 8)
+        self.cell(0, 10, f"Page {self.page_no()}", 0, 0, "C")
+
+    def add_table_header(self):
+        self.set_fill_color(230, 240, 250)
+        self.set_font("NanumGothic", "B", 10)
+        headers = ["ID", "일자", "분류", "내역/설명", "단가", "수량", "금액", "참여자", "비고"]
+        self.col_widths = [20, 27, 20, 90, 18, 12, 22, 21, 27]
+        for i, header in enumerate(headers):
+            self.cell(self.col_widths[i], 8, header, 1, 0, "C", 1)
+        self.ln()
+
+    def add_expense_row(self, cells):
+        w = self.col_widths
+        expense_id, date, category, description, price, qty, amount, traveler, note = cells
+        self.cell(w[0], 7, expense_id, 1)
+        self.cell(w[1], 7, date, 1)
+        self.cell(w[2], 7, category, 1)
+        self.cell(w[3], 7, description, 1)
+        self.cell(w[4], 7, price, 1, 0, "R")
+        self.cell(w[5], 7, qty, 1, 0, "R")
+        self.cell(w[6], 7, amount, 1, 0, "R")
+        self.cell(w[7], 7, traveler, 1)
+        self.cell(w[8], 7, note, 1)
+        self.ln()
+
+    def add_table(self, table):
+        """format_report_rows 로 미리 만든 문자열 표를 출력한다."""
+        self.add_table_header()
+        self.set_font("NanumGothic", "", 9)
+        for cells in table.itertuples(index=False, name=None):
+            self.add_expense_row(cells)
+
+    def add_summary(self, total, balance):
+        self.ln(3)
+        self.set_font("NanumGothic", "B", 11)
+        self.cell(0, 9, f"집행 총계: ￦{total:,}    잔여 예산: ￦{balance:,}", 0, 1, "R")
+
+
+def preload_fonts():
+    """한글 폰트를 미리 파싱해 폰트 캐시를 채운다. (첫 보고서 생성 지연 제거)"""
+    ExpenseReportPDF()
+
+
+def _text(df, col):
+    if col not in df.columns:
+        return pd.Series("", index=df.index)
+    values = df[col]
+    return values.astype(object).where(values.notna(), "").astype(str)
+
+
+def format_report_rows(expense_df):
+    """보고서 표의 셀 문자열과 행별 금액(단가 × 수량)을 열 단위로 한 번에 만든다."""
+    price = pd.to_numeric(expense_df["금액"], errors="coerce").fillna(0).astype("int64")
+    if "수량" in expense_df.columns:
+        qty = pd.to_numeric(expense_df["수량"], errors="coerce").fillna(1).astype("int64")
+        qty = qty.where(qty != 0, 1)
+    else:
+        qty = pd.Series(1, index=expense_df.index, dtype="int64")
+    line_totals = price * qty
+    table = pd.DataFrame({
+        "ID": _text(expense_df, "ID"),
+        "날짜": _text(expense_df, "날짜").str[:10],
+        "분류": _text(expense_df, "분류"),
+        "설명": _text(expense_df, "설명").str[:35],  # 설명 길이 제한
+        "단가": price.map("{:,}".format),
+        "수량": qty.astype(str),
+        "금액": line_totals.map("{:,}".format),
+        "여행자": _text(expense_df, "여행자"),
+        "비고": _text(expense_df, "비고"),
+    })
+    return table, int(line_totals.sum())
+
+
+def write_pdf_report(expense_df, out, report_title="예산 집행내역서", project_name="", period="", budget_total=0):
+    """보고서를 파일 경로 또는 바이너리 스트림에 쓰고 집행 총계를 반환한다.
+
+    문서 본문(페이지·폰트 객체)은 만들어지는 대로 스트림에 기록되므로 완성된 PDF 전체를
+    문자열로 들고 있다가 다시 인코딩하지 않는다.
+    """
+    table, total_spent = format_report_rows(expense_df)
+    close_after = isinstance(out, str)
+    f = open(out, "wb") if close_after else out
+    try:
+        pdf = ExpenseReportPDF(report_title, project=project_name, period=period)
+        pdf.buffer = _StreamBuffer(f)
+        pdf.add_page()
+        pdf.add_table(table)
+        del table
+        balance = budget_total - total_spent if budget_total > 0 else 0
+        pdf.add_summary(total_spent, balance)
+        pdf.close()
+    finally:
+        if close_after:
+            f.close()
+    return total_spent
+
+
+# --- 보고서 바이트 캐시 ---
+_report_cache = OrderedDict()
+_report_lock = threading.Lock()
+
+
+def report_cache_key(expense_df, report_title, project_name, period, budget_total):
+    h = hashlib.sha256()
+    h.update(pd.util.hash_pandas_object(expense_df, index=False).values.tobytes())
+    h.update("\x1f".join(map(str, expense_df.columns)).encode())
+    h.update("\x1f".join(map(str, (report_title, project_name, period, budget_total))).encode())
+    return h.hexdigest()
+
+
+def generate_pdf_report_bytes(expense_df, report_title="예산 집행내역서", project_name="", period="", budget_total=0):
+    key = report_cache_key(expense_df, report_title, project_name, period, budget_total)
+    with _report_lock:
+        if key in _report_cache:
+            _report_cache.move_to_end(key)
+            return _report_cache[key]
+    out = io.BytesIO()
+    write_pdf_report(expense_df, out, report_title, project_name, period, budget_total)
+    pdf_bytes = out.getvalue()
+    with _report_lock:
+        _report_cache[key] = pdf_bytes
+        while len(_report_cache) > REPORT_CACHE_SIZE:
+            _report_cache.popitem(last=False)
+    return pdf_bytes
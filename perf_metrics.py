@@ -0,0 +1,151 @@
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# --- 성능 계측 (구간 시간 히스토그램, 게이지, Prometheus 텍스트 출력) ---
+# 초 단위 히스토그램 구간 (마지막은 +Inf)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class _Histogram:
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self, n_buckets):
+        self.counts = [0] * n_buckets
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+
+class Metrics:
+    """프로세스 안의 모든 세션이 함께 쓰는 계측 레지스트리. 기록은 잠금 한 번으로 끝난다."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._gauges = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram(len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    hist.counts[i] += 1
+                    break
+            hist.count += 1
+            hist.sum += seconds
+            hist.max = max(hist.max, seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def timed(self, name, **labels):
+        """함수 호출 시간을 name 히스토그램에 기록하는 데코레이터."""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = float(value)
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._gauges.clear()
+
+    def summary(self):
+        """[{지표, 라벨, 횟수, 평균(ms), 최대(ms), 합계(s)}] 목록 (진단 화면 표)."""
+        with self._lock:
+            items = [(name, key, h.count, h.sum, h.max) for (name, key), h in self._histograms.items()]
+        return [{"지표": name, "라벨": ", ".join(f"{k}={v}" for k, v in key), "횟수": count,
+                 "평균(ms)": round(total / count * 1000, 1) if count else 0.0,
+                 "최대(ms)": round(peak * 1000, 1), "합계(s)": round(total, 3)}
+                for name, key, count, total, peak in sorted(items, key=lambda x: -x[3])]
+
+    def to_prometheus(self):
+        """Prometheus 텍스트 노출 형식(0.0.4) 문자열."""
+        with self._lock:
+            histograms = {k: (list(h.counts), h.count, h.sum) for k, h in self._histograms.items()}
+            gauges = dict(self._gauges)
+        lines, declared = [], set()
+
+        def declare(name, kind):
+            if name not in declared:
+                declared.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, key), (counts, count, total) in sorted(histograms.items()):
+            declare(name, "histogram")
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', repr(bound))])} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+            lines.append(f"{name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{name}_count{_format_labels(key)} {count}")
+        for (name, key), value in sorted(gauges.items()):
+            declare(name, "gauge")
+            lines.append(f"{name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """node_exporter textfile 수집기용으로 원자적으로 파일을 바꿔 쓴다."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
+def process_memory_bytes():
+    """현재 프로세스의 상주 메모리(RSS). /proc 이 없으면 최대 RSS 로 대신한다."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+metrics = Metrics()
+metrics.describe("app_page_seconds", "메뉴별 화면 처리 시간")
+metrics.describe("app_ocr_seconds", "영수증 OCR 시간 (캐시 조회 포함)")
+metrics.describe("app_pdf_report_seconds", "집행내역서 PDF 생성 시간")
+metrics.describe("app_chart_seconds", "분석 차트 렌더링 시간")
+metrics.describe("app_csv_import_seconds", "CSV 가져오기 시간")
+metrics.describe("app_process_resident_bytes", "프로세스 상주 메모리")
+metrics.describe("app_ledger_column_bytes", "원장 컬럼별 저장 크기")
+metrics.describe("app_ledger_rows", "원장 행 수")
@@ -0,0 +1,159 @@
+import functools
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# --- 영수증 OCR (전처리, 결과 캐시, 일괄 처리) ---
+TESSERACT_CMD = "/usr/bin/tesseract"
+# 80mm 감열지 영수증을 약 300 DPI 로 본 폭. 이보다 큰 사진은 줄여서 OCR 한다.
+OCR_TARGET_WIDTH = 1000
+# 합계/날짜가 주로 찍히는 영수증 하단 비율
+TOTALS_REGION_RATIO = 0.45
+
+_AMOUNT_RE = re.compile(r"\d{3,}")
+_DATE_RE = re.compile(r"((19|20)\d{2}[-/.](0[1-9]|1[0-2])[-/.](0[1-9]|[12][0-9]|3[01]))")
+
+
+# pytesseract/PIL 은 OCR 을 실제로 할 때 처음 불러온다 (앱 시작·다른 메뉴에는 필요 없음)
+@functools.lru_cache(maxsize=None)
+def _pytesseract():
+    import pytesseract
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+    return pytesseract
+
+
+@functools.lru_cache(maxsize=None)
+def tesseract_version():
+    """설치된 tesseract 버전 문자열, 없으면 None. 외부 프로세스를 띄우므로 프로세스당 한 번만 확인한다."""
+    try:
+        return str(_pytesseract().get_tesseract_version())
+    except Exception:
+        return None
+
+
+def parse_expense_text(text):
+    amount, date = 0, None
+    amounts = _AMOUNT_RE.findall(text.replace(",", ""))
+    if amounts: amount = max(map(int, amounts))
+    date_match = _DATE_RE.search(text)
+    if date_match: date = date_match.group(1).replace(".", "-").replace("/", "-")
+    return date, amount
+
+
+def preprocess_for_ocr(img, crop_totals=False):
+    from PIL import Image, ImageOps
+    img = ImageOps.exif_transpose(img).convert("L")
+    if img.width > OCR_TARGET_WIDTH:
+        height = round(img.height * OCR_TARGET_WIDTH / img.width)
+        img = img.resize((OCR_TARGET_WIDTH, height), Image.LANCZOS)
+    if crop_totals:
+        img = img.crop((0, int(img.height * (1 - TOTALS_REGION_RATIO)), img.width, img.height))
+    return img
+
+
+def ocr_receipt_bytes(data, crop_totals=False):
+    """영수증 원본 바이트를 OCR 해 {date, amount, text} 를 반환한다. (워커 프로세스에서 호출)"""
+    from PIL import Image
+    with Image.open(io.BytesIO(data)) as img:
+        text = _pytesseract().image_to_string(preprocess_for_ocr(img, crop_totals), lang="kor+eng")
+    date, amount = parse_expense_text(text)
+    return {"date": date, "amount": amount, "text": text}
+
+
+def _ocr_worker(data, crop_totals):
+    # pytesseract 예외 중에는 pickle 되지 않는 것이 있어 워커 안에서 문자열로 바꿔 돌려준다
+    try:
+        return ocr_receipt_bytes(data, crop_totals)
+    except Exception as e:
+        return {"date": None, "amount": 0, "text": "", "error": f"{type(e).__name__}: {e}"}
+
+
+class OcrCache:
+    """이미지 해시별 OCR 결과를 메모리와 디스크(JSON)에 보관한다."""
+
+    def __init__(self, root):
+        self.root = root
+        self._memory = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def key(digest, crop_totals=False):
+        return digest + ("-totals" if crop_totals else "")
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + ".ocr.json")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                return self._memory[key]
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self._memory[key] = result
+        return result
+
+    def put(self, key, result):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._memory[key] = result
+
+
+def ocr_cached(data, cache, digest=None, crop_totals=False):
+    digest = digest or hashlib.sha256(data).hexdigest()
+    key = cache.key(digest, crop_totals)
+    result = cache.get(key)
+    if result is None:
+        result = ocr_receipt_bytes(data, crop_totals)
+        cache.put(key, result)
+    return result
+
+
+def ocr_batch(items, cache, crop_totals=False, max_workers=None, on_progress=None):
+    """(해시, 원본 바이트) 목록을 프로세스 풀에서 OCR 한다.
+
+    캐시에 있는 항목은 건너뛰고, 완료될 때마다 on_progress(해시, 결과, 완료 수, 전체 수)
+    를 호출한다. 실패한 항목은 결과에 "error" 키를 담는다.
+    """
+    results, pending = {}, {}
+    for digest, data in items:
+        cached = cache.get(cache.key(digest, crop_totals))
+        if cached is not None:
+            results[digest] = cached
+        else:
+            pending.setdefault(digest, data)
+    total = len(results) + len(pending)
+    done = 0
+    for digest, result in results.items():
+        done += 1
+        if on_progress: on_progress(digest, result, done, total)
+    if not pending:
+        return results
+    # Streamlit 스크립트 스레드에서 fork 하지 않도록 spawn 컨텍스트를 쓴다
+    ctx = multiprocessing.get_context("spawn")
+    workers = min(max_workers or os.cpu_count() or 1, len(pending))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = {pool.submit(_ocr_worker, data, crop_totals): digest for digest, data in pending.items()}
+        for future in as_completed(futures):
+            digest = futures[future]
+            result = future.result()
+            if "error" not in result:
+                cache.put(cache.key(digest, crop_totals), result)
+            results[digest] = result
+            done += 1
+            if on_progress: on_progress(digest, result, done, total)
+    return results
@@ -0,0 +1,86 @@
+import hashlib
+import io
+import os
+import re
+
+# --- 영수증 이미지 저장소 (내용 해시 기반) ---
+DEFAULT_RECEIPT_DIR = "receipts"
+THUMBNAIL_SIZE = (240, 240)
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def is_receipt_hash(value):
+    return isinstance(value, str) and bool(_HASH_RE.match(value))
+
+
+class ReceiptStore:
+    """영수증 원본을 SHA-256 해시로 한 번만 저장하고, 업로드 시 썸네일을 만든다.
+
+    원장 `이미지` 컬럼에는 해시만 남기고 원본은 열람할 때만 디코딩한다.
+    """
+
+    def __init__(self, root=DEFAULT_RECEIPT_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _dir(self, digest):
+        return os.path.join(self.root, digest[:2])
+
+    def original_path(self, digest):
+        return os.path.join(self._dir(digest), digest)
+
+    def thumbnail_path(self, digest):
+        return os.path.join(self._dir(digest), digest + ".thumb.jpg")
+
+    def exists(self, digest):
+        return os.path.exists(self.original_path(digest))
+
+    def put(self, data):
+        """원본 바이트를 저장하고 해시를 반환한다. 같은 내용은 다시 쓰지 않는다."""
+        digest = hashlib.sha256(data).hexdigest()
+        if self.exists(digest):
+            return digest
+        os.makedirs(self._dir(digest), exist_ok=True)
+        from PIL import Image  # 업로드할 때만 필요하므로 앱 시작 시 불러오지 않는다
+        with Image.open(io.BytesIO(data)) as img:
+            thumb = img.convert("RGB")
+            thumb.thumbnail(THUMBNAIL_SIZE)
+            thumb.save(self.thumbnail_path(digest), format="JPEG", quality=80)
+        # 원본은 임시 파일에 쓴 뒤 교체해 동시 업로드에도 깨진 파일이 남지 않게 한다
+        tmp_path = f"{self.original_path(digest)}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self.original_path(digest))
+        return digest
+
+    def read_bytes(self, digest):
+        with open(self.original_path(digest), "rb") as f:
+            return f.read()
+
+    def open(self, digest):
+        from PIL import Image
+        return Image.open(io.BytesIO(self.read_bytes(digest)))
+
+    def thumbnail(self, digest):
+        from PIL import Image
+        return Image.open(self.thumbnail_path(digest))
+
+    def perceptual_hash(self, digest):
+        """중복 탐지용 64비트 지각 해시(dHash). 업로드 때 만든 썸네일로 계산한다."""
+        from duplicate_check import dhash
+        with self.thumbnail(digest) as thumb:
+            return dhash(thumb)
+
+    def disk_usage(self):
+        """(원본 수, 원본 바이트, 썸네일 바이트). 디렉토리를 훑으므로 진단 화면에서만 쓴다."""
+        originals, original_bytes, thumb_bytes = 0, 0, 0
+        for sub in os.scandir(self.root):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".thumb.jpg"):
+                    thumb_bytes += entry.stat().st_size
+                elif is_receipt_hash(entry.name):
+                    originals += 1
+                    original_bytes += entry.stat().st_size
+        return originals, original_bytes, thumb_bytes
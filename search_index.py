@@ -0,0 +1,75 @@
+import re
+import unicodedata
+from collections import Counter
+
+# --- 설명/비고 전문 검색 (글자 바이그램 역색인) ---
+# 형태소 분석 없이 한글을 찾도록 단어마다 두 글자씩 잘라 색인한다. ("택시비" -> 택시, 시비)
+# 색인은 원장과 같은 트랜잭션에서 추가되고, 경비가 지워지면 트리거가 해당 문서를 뺀다.
+# search_docs 는 색인과 같은 정규화(NFKC, 소문자)를 거친 본문으로, 후보의 실제 포함 여부를 확인할 때 쓴다.
+SEARCH_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_postings (
+    gram TEXT NOT NULL,
+    doc  INTEGER NOT NULL,
+    tf   INTEGER NOT NULL,
+    PRIMARY KEY (gram, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_search_postings_doc ON search_postings (doc);
+CREATE TABLE IF NOT EXISTS search_docs (
+    doc  INTEGER PRIMARY KEY,
+    text TEXT NOT NULL
+);
+DROP TRIGGER IF EXISTS trg_expenses_search_delete;
+CREATE TRIGGER trg_expenses_search_delete AFTER DELETE ON expenses BEGIN
+    DELETE FROM search_postings WHERE doc = OLD."ID";
+    DELETE FROM search_docs WHERE doc = OLD."ID";
+END;
+"""
+SEARCH_COLUMNS = ("설명", "비고")
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def words(text):
+    return _WORD_RE.findall(unicodedata.normalize("NFKC", text).lower())
+
+
+def word_grams(word):
+    return [word] if len(word) == 1 else [word[i:i + 2] for i in range(len(word) - 1)]
+
+
+def tokenize(text):
+    """텍스트를 {바이그램: 빈도} 로 바꾼다. 한 글자 단어는 그 글자 하나로 색인한다."""
+    counts = Counter()
+    for word in words(text):
+        counts.update(word_grams(word))
+    return counts
+
+
+def normalize(text):
+    """색인과 같은 기준으로 정규화한 본문 (단어를 공백 하나로 이어 붙인다)."""
+    return " ".join(words(text))
+
+
+def postings(ids, texts):
+    """(gram, doc, tf) 행을 차례로 만든다. search_postings 에 executemany 로 넣는다."""
+    for doc, text in zip(ids, texts):
+        for gram, tf in tokenize(text).items():
+            yield gram, doc, tf
+
+
+def document_texts(frame):
+    """검색 대상 컬럼(설명, 비고)을 한 문자열로 합친다."""
+    text = frame[SEARCH_COLUMNS[0]].astype("string").fillna("")
+    for col in SEARCH_COLUMNS[1:]:
+        text = text + " " + frame[col].astype("string").fillna("")
+    return text.tolist()
+
+
+def query_terms(text):
+    """검색어를 단어 목록과, 색인에서 찾을 바이그램 집합으로 나눈다.
+
+    한 글자 단어는 다른 단어 가운데에도 나오므로 색인 대신 부분 문자열 검사로만 거른다.
+    """
+    terms = words(text)
+    grams = sorted({g for word in terms if len(word) > 1 for g in word_grams(word)})
+    return terms, grams
@@ -0,0 +1,133 @@
+import heapq
+
+import pandas as pd
+
+# --- 정산 (참여자별 잔액, 최소 송금 목록) ---
+
+
+def line_totals(df):
+    """경비별 실제 지출액(금액 × 수량, 수량 미기재는 1)."""
+    price = pd.to_numeric(df["금액"], errors="coerce").fillna(0)
+    if "수량" not in df.columns:
+        return price
+    qty = pd.to_numeric(df["수량"], errors="coerce").fillna(1)
+    return price * qty.where(qty != 0, 1)
+
+
+def spent_by_traveler(df):
+    if df.empty:
+        return pd.Series(dtype="float64")
+    return line_totals(df).groupby(df["여행자"].fillna(""), sort=False).sum()
+
+
+def round_balances(values):
+    """정산 금액을 원 단위 정수로 맞춘다. 각자 반올림하면 합이 0 이 안 될 수 있어 (100원을 셋이 나누면
+    -67/+33/+33) 모두 내림한 뒤 모자란 만큼 소수부가 큰 사람부터 1원씩 더한다 (최대 나머지 방식)."""
+    values = pd.Series(values, dtype="float64").round(6)
+    floors = values // 1
+    shortfall = int(round(values.sum() - floors.sum()))
+    floors[(values - floors).sort_values(ascending=False, kind="stable").index[:shortfall]] += 1
+    return floors.astype("int64")
+
+
+def settle_balances(per_person_amount):
+    # 참여자별 지출 합계(dict 또는 Series)로 1인당 부담금과 정산 금액을 계산
+    per_person_amount = dict(per_person_amount)
+    if not per_person_amount: return [], 0, {}
+    travelers = list(per_person_amount)
+    per_person = sum(per_person_amount.values()) / len(travelers)
+    balances = round_balances({t: per_person - amt for t, amt in per_person_amount.items()}).to_dict()
+    return travelers, per_person, balances
+
+
+def get_settlement_info(df):
+    if df.empty: return [], 0, {}
+    return settle_balances(spent_by_traveler(df))
+
+
+def _check_weights(weights, label):
+    if (weights <= 0).any() or weights.isna().any():
+        raise ValueError(f"{label}는 0보다 커야 합니다.")
+
+
+def compute_balances(df, shares=None, weights=None, participants=None):
+    """참여자별 지출·부담·정산 금액 표를 만든다. (정산 = 부담 - 지출, 양수면 더 내야 함)
+
+    - shares: 경비별 참여자 지정 (컬럼 ID, 참여자, 가중치[선택]). 지정된 경비는 그 참여자들이
+      가중치 비율로 나누고, 지정되지 않은 경비는 전체 참여자가 나눈다.
+    - weights: 참여자별 기본 가중치 (dict/Series, 기본 1).
+    - participants: 지출이 없어도 정산에 포함할 참여자 목록.
+
+    가중치가 0 이하이거나 shares 에 필수 컬럼이 없으면 ValueError 를 낸다. (나눌 사람이 없어 금액이 사라지므로)
+    """
+    if weights is not None:
+        _check_weights(pd.Series(weights, dtype="float64"), "참여자 가중치")
+    if shares is not None:
+        missing = {"ID", "참여자"} - set(shares.columns)
+        if missing:
+            raise ValueError(f"경비별 참여자 CSV 에 필수 컬럼 누락: {sorted(missing)}")
+        if "가중치" in shares:
+            _check_weights(pd.to_numeric(shares["가중치"], errors="coerce").dropna(), "경비별 참여자 가중치")
+    costs = line_totals(df)
+    payers = df["여행자"].fillna("")
+    paid = costs.groupby(payers, sort=False).sum()
+    weights = pd.Series(weights if weights is not None else {}, dtype="float64")
+    people = pd.Index(paid.index)
+    for extra in (participants, shares["참여자"].unique() if shares is not None else None, weights.index):
+        if extra is not None:
+            people = people.union(pd.Index(list(extra)), sort=False)
+    base_weight = pd.Series(1.0, index=people)
+    base_weight.update(weights)
+
+    owed = pd.Series(0.0, index=people)
+    unshared = costs
+    if shares is not None and not shares.empty:
+        s = shares[["ID", "참여자"]].copy()
+        s["가중치"] = pd.to_numeric(shares["가중치"], errors="coerce").fillna(1.0) if "가중치" in shares else 1.0
+        s = s.merge(pd.DataFrame({"ID": df["ID"].values, "cost": costs.values}), on="ID", how="inner")
+        s["share"] = s["cost"] * s["가중치"] / s.groupby("ID")["가중치"].transform("sum")
+        owed = owed.add(s.groupby("참여자")["share"].sum(), fill_value=0)
+        unshared = costs[~df["ID"].isin(s["ID"]).values]
+    if len(people) and base_weight.sum() > 0:
+        owed = owed.add(unshared.sum() * base_weight / base_weight.sum(), fill_value=0)
+
+    table = pd.DataFrame({"지출": paid.reindex(people).fillna(0), "부담": owed.reindex(people).fillna(0)})
+    table["정산"] = round_balances(table["부담"] - table["지출"])
+    table.index.name = "참여자"
+    return table
+
+
+def minimize_transfers(balances):
+    """정산 금액(양수: 낼 사람, 음수: 받을 사람)으로 송금 목록 [(보내는 사람, 받는 사람, 금액)] 을 만든다.
+
+    금액이 정확히 맞는 쌍을 먼저 지우고, 남은 사람은 가장 많이 낼 사람과 가장 많이 받을
+    사람을 힙에서 꺼내 맞추는 탐욕 방식으로 묶는다. 송금 횟수는 많아야 (인원 - 1) 이다.
+    """
+    balances = {p: int(round(v)) for p, v in dict(balances).items() if round(v) != 0}
+    transfers = []
+    # 같은 금액을 주고받을 사람끼리 한 번에 정리
+    creditors_by_amount = {}
+    for person, amount in balances.items():
+        if amount < 0:
+            creditors_by_amount.setdefault(-amount, []).append(person)
+    for person, amount in list(balances.items()):
+        if amount > 0 and creditors_by_amount.get(amount):
+            creditor = creditors_by_amount[amount].pop()
+            transfers.append((person, creditor, amount))
+            del balances[person], balances[creditor]
+
+    debtors = [(-amount, person) for person, amount in balances.items() if amount > 0]
+    creditors = [(amount, person) for person, amount in balances.items() if amount < 0]
+    heapq.heapify(debtors)
+    heapq.heapify(creditors)
+    while debtors and creditors:
+        debt, debtor = heapq.heappop(debtors)
+        credit, creditor = heapq.heappop(creditors)
+        amount = min(-debt, -credit)
+        transfers.append((debtor, creditor, amount))
+        if -debt > amount:
+            heapq.heappush(debtors, (debt + amount, debtor))
+        if -credit > amount:
+            heapq.heappush(creditors, (credit + amount, creditor))
+    return transfers
+
@@ -0,0 +1,71 @@
+import io
+import random
+
+import pytest
+from PIL import Image, ImageDraw
+
+from duplicate_check import PHASH_MAX_DISTANCE, hamming
+from ledger_store import LedgerStore
+from receipt_store import ReceiptStore
+
+
+def same_layout_receipt(seed, size=(400, 640)):
+    # 한 가맹점의 영수증: 머리글·구분선·바닥 배너는 같고 품목과 금액만 다르다
+    rng = random.Random(seed)
+    img = Image.new("RGB", (400, 640), "white")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((20, 20, 380, 80), fill="black")
+    draw.text((40, 40), "CAFE BEANS", fill="white")
+    for j in range(8):
+        draw.text((30, 110 + j * 40), f"ITEM {rng.randint(1, 99):02d}", fill="black")
+        draw.text((300, 110 + j * 40), f"{rng.randint(10, 99) * 100:,}", fill="black")
+    draw.line((20, 440, 380, 440), fill="black", width=3)
+    draw.text((30, 460), f"TOTAL {rng.randint(100, 999) * 100:,}", fill="black")
+    draw.rectangle((60, 540, 340, 600), fill="black")
+    buf = io.BytesIO()
+    img.resize(size).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def stores(tmp_path):
+    ledger = LedgerStore(str(tmp_path / "ledger.db"))
+    receipts = ReceiptStore(str(tmp_path / "receipts"))
+    yield ledger, receipts
+    ledger.close()
+
+
+def put(ledger, receipts, data):
+    digest = receipts.put(data)
+    ledger.add_receipt_hashes({digest: receipts.perceptual_hash(digest)})
+    return digest
+
+
+def test_distinct_receipts_with_same_layout_are_not_flagged(stores):
+    ledger, receipts = stores
+    digests = [put(ledger, receipts, same_layout_receipt(i)) for i in range(10)]
+    hashes = [receipts.perceptual_hash(d) for d in digests]
+    # 전제: 양식이 같으면 서로 다른 영수증도 해시 거리가 임계값 안에 든다
+    assert all(hamming(hashes[0], h) <= PHASH_MAX_DISTANCE for h in hashes[1:])
+    ledger.append([{"프로젝트": "워크숍", "날짜": "2024-05-01", "금액": 1000 * (i + 1), "여행자": f"참여자{i}",
+                    "이미지": digest} for i, digest in enumerate(digests)])
+
+    new = put(ledger, receipts, same_layout_receipt(99))
+    suspects = ledger.find_duplicates({"날짜": "2024-05-01", "금액": 4200, "여행자": "참여자99", "이미지": new})
+    assert suspects.empty
+
+
+def test_reshot_receipt_with_same_amount_and_date_is_flagged(stores):
+    ledger, receipts = stores
+    original = put(ledger, receipts, same_layout_receipt(3))
+    ledger.append({"프로젝트": "워크숍", "날짜": "2024-05-01", "금액": 4000, "여행자": "갑", "이미지": original})
+
+    reshot = put(ledger, receipts, same_layout_receipt(3, size=(300, 480)))
+    suspects = ledger.find_duplicates({"날짜": "2024-05-02", "금액": 4000, "여행자": "을", "이미지": reshot})
+    assert suspects["ID"].tolist() == [1]
+    assert suspects["사유"].str.startswith("비슷한 영수증 이미지").all()
+
+    # 금액이 다르면 비슷한 이미지만으로는 의심하지 않지만, 같은 이미지는 금액과 무관하게 잡는다
+    assert ledger.find_duplicates({"날짜": "2024-05-02", "금액": 3900, "여행자": "을", "이미지": reshot}).empty
+    same = ledger.find_duplicates({"날짜": "2024-06-30", "금액": 1, "여행자": "을", "이미지": original})
+    assert same["사유"].tolist() == ["같은 영수증 이미지"]